@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Measure cold-start cost of the game Lambda: import-to-first-response.
+
+Every run starts a fresh interpreter, imports ``lambda/game.py`` and calls
+``handler`` once, the way a new Lambda container does.  The table names and
+any other settings come from the environment (or ``--env``), so point it at
+a dev stack to include the first DynamoDB round trip, or measure offline:
+
+    python benchmarks/cold_start.py --runs 50 --env STORAGE_BACKEND=memory
+    python benchmarks/cold_start.py --event my_event.json --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, 'lambda')
+
+DEFAULT_EVENT = {
+    'httpMethod': 'POST',
+    'resource': '/games',
+    'requestContext': {'identity': {}},
+    'body': None
+}
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import game
+imported = time.perf_counter()
+response = game.handler(json.loads(sys.argv[1]), None)
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_response_ms': (done - imported) * 1000,
+    'import_to_response_ms': (done - start) * 1000,
+    'statusCode': response['statusCode']
+}))
+"""
+
+METRICS = ('import_ms', 'first_response_ms', 'import_to_response_ms', 'process_ms')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def run_once(event, env):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, json.dumps(event)],
+        cwd=LAMBDA_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    sample = json.loads(output.strip().splitlines()[-1])
+    sample['process_ms'] = (time.perf_counter() - start) * 1000
+    return sample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--event', help='JSON file with the API Gateway event to send')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the Lambda process')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    event = DEFAULT_EVENT
+    if args.event:
+        with open(args.event) as f:
+            event = json.load(f)
+    env = dict(os.environ, PYTHONPATH=LAMBDA_DIR)
+    env.update(pair.split('=', 1) for pair in args.env)
+
+    samples = [run_once(event, env) for _ in range(args.runs)]
+    summary = {
+        metric: {
+            'p50': percentile([s[metric] for s in samples], 50),
+            'p90': percentile([s[metric] for s in samples], 90),
+            'p99': percentile([s[metric] for s in samples], 99),
+        }
+        for metric in METRICS
+    }
+    summary['runs'] = args.runs
+    summary['statusCodes'] = sorted({s['statusCode'] for s in samples})
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{args.runs} cold starts, status codes {summary['statusCodes']}")
+    for metric in METRICS:
+        row = summary[metric]
+        print(f"  {metric:<24} p50 {row['p50']:8.1f} ms   p90 {row['p90']:8.1f} ms   p99 {row['p99']:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
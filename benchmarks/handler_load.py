@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Drive the full game handler with concurrent self-playing clients.
+
+Each worker thread creates games and plays random legal moves through
+``game.handler`` until the game ends, exactly as API Gateway would call it.
+Run it offline against the in-memory tables::
+
+    STORAGE_BACKEND=memory python benchmarks/handler_load.py --threads 8 --games 50
+
+Reports requests per second, latency percentiles per route and the status
+codes seen; any 5xx or unexpected 4xx shows up there.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from cold_start import LAMBDA_DIR, percentile
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import game  # noqa: E402
+
+MAX_PLIES = 200
+
+
+def request(method, resource, game_id=None, body=None, query=None):
+    return {
+        'httpMethod': method,
+        'resource': resource,
+        'pathParameters': {'gameId': game_id} if game_id else None,
+        'queryStringParameters': query,
+        'requestContext': {'identity': {}},
+        'body': json.dumps(body) if body is not None else None
+    }
+
+
+class Worker(threading.Thread):
+    def __init__(self, games, seed):
+        super().__init__()
+        self.games = games
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+
+    def call(self, route, event):
+        start = time.perf_counter()
+        response = game.handler(event, None)
+        self.latencies[route].append((time.perf_counter() - start) * 1000)
+        self.statuses[response['statusCode']] += 1
+        return response['statusCode'], json.loads(response['body'])
+
+    def run(self):
+        for _ in range(self.games):
+            status, state = self.call('POST /games', request('POST', '/games', query={'includeMoves': 'true'}))
+            if status != 201:
+                continue
+            game_id = state['gameId']
+            for _ in range(MAX_PLIES):
+                if state['status'] == 'finished' or not state['legalMoves']:
+                    break
+                path = self.rng.choice(state['legalMoves'])['path']
+                status, state = self.call('PUT /games/{gameId}', request(
+                    'PUT', '/games/{gameId}', game_id, {'path': path}, {'includeMoves': 'true'}
+                ))
+                if status != 200:
+                    break
+            self.call('GET /games/{gameId}', request('GET', '/games/{gameId}', game_id))
+        self.call('GET /games', request('GET', '/games', query={'limit': '20'}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--games', type=int, default=20, help='games per thread')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="keep the handler's own output")
+    args = parser.parse_args(argv)
+
+    workers = [Worker(args.games, args.seed + i) for i in range(args.threads)]
+    with open(os.devnull, 'w') as devnull, contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+    latencies = defaultdict(list)
+    statuses = Counter()
+    for worker in workers:
+        statuses.update(worker.statuses)
+        for route, values in worker.latencies.items():
+            latencies[route].extend(values)
+    total = sum(statuses.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s), "
+          f"storage {os.environ.get('STORAGE_BACKEND', 'dynamodb')}, status codes {dict(sorted(statuses.items()))}")
+    for route, values in sorted(latencies.items()):
+        print(f"  {route:<22} n={len(values):<6} p50 {percentile(values, 50):7.2f} ms   "
+              f"p99 {percentile(values, 99):7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Perft: count the leaves of the legal-move tree to a fixed depth.
+
+The counts pin down move generation exactly (mandatory captures, whole
+multi-jump chains as one move, crowning ending the move), so any change to
+``rules`` or the engine's move loop has to reproduce them.  Nodes per second
+is the speed gate for the same code.
+
+    python benchmarks/perft.py              # every position, every reference depth
+    python benchmarks/perft.py --depth 9 --position initial
+
+Exits non-zero when a count differs from its reference.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+import rules  # noqa: E402
+
+# Published node counts for the opening position of English draughts; the
+# other references were cross-checked with an independent square-by-square
+# generator (tests/unit/test_perft.py)
+POSITIONS = {
+    'initial': {
+        'board': None,
+        'color': rules.RED,
+        'counts': {1: 7, 2: 49, 3: 302, 4: 1469, 5: 7361, 6: 36768, 7: 179740, 8: 845931},
+    },
+    # Red's only moves are double and triple jumps that branch twice
+    'multi_jump': {
+        'board': ['b.....B.', '........', '..b.b...', '........', '....b.b.', '........', 'r...b...', '...r...r'],
+        'color': rules.RED,
+        'counts': {1: 3, 2: 11, 3: 31, 4: 240, 5: 837, 6: 5339, 7: 17497, 8: 102230},
+    },
+    # The man crowns on (0, 4) and has to stop although a king could jump on
+    'promotion_mid_jump': {
+        'board': ['........', '...b.b..', '..r.....', '...b....', '....r...', '........', '......B.', '.R......'],
+        'color': rules.RED,
+        'counts': {1: 1, 2: 1, 3: 1, 4: 4, 5: 24, 6: 102, 7: 571, 8: 1910},
+    },
+    # A surrounded red king capturing backwards and forwards
+    'king_captures': {
+        'board': ['........', '...b....', '........', '...b.b..', '....R...', '.B.b.B..', '........', '.r.....r'],
+        'color': rules.RED,
+        'counts': {1: 4, 2: 48, 3: 234, 4: 1830, 5: 7923, 6: 52877, 7: 219553},
+    },
+    # A black king with captures in all four directions
+    'black_king_captures': {
+        'board': ['......b.', '........', 'R.r.R...', '...B....', '..r.r...', '........', '....r...', '........'],
+        'color': rules.BLACK,
+        'counts': {1: 4, 2: 33, 3: 146, 4: 1196, 5: 5248, 6: 39527, 7: 149110},
+    },
+    # Many quiet moves, but the single capture is mandatory
+    'forced_capture': {
+        'board': ['..b.....', '.b...b..', '..b.b...', '........', '......b.', '.r.r.r..', 'r.....r.', '...r....'],
+        'color': rules.RED,
+        'counts': {1: 1, 2: 7, 3: 55, 4: 322, 5: 1857, 6: 9430, 7: 46127, 8: 204619},
+    },
+}
+
+
+def parse_board(rows):
+    """Build a board from eight strings using ``.`` for empty squares"""
+    return [['' if piece == '.' else piece for piece in row] for row in rows]
+
+
+def position_of(name):
+    entry = POSITIONS[name]
+    if entry['board'] is None:
+        return rules.INITIAL, entry['color']
+    return rules.from_board(parse_board(entry['board'])), entry['color']
+
+
+def make_move(pos, color, move):
+    for hop_from, hop_to in zip(move, move[1:]):
+        pos, _, _ = rules.apply_step(pos, hop_from, hop_to, color)
+    return pos
+
+
+def perft(pos, color, depth):
+    """Number of move sequences of exactly ``depth`` plies; games that end sooner count 0"""
+    moves = rules.legal_moves(pos, color)
+    if depth == 1:
+        return len(moves)
+    other = rules.opponent(color)
+    return sum(perft(make_move(pos, color, move), other, depth - 1) for move in moves)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft move generation benchmark')
+    parser.add_argument('--position', action='append', choices=sorted(POSITIONS),
+                        help='position to run (default: all)')
+    parser.add_argument('--depth', type=int, help='run only this depth')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    total_nodes = 0
+    total_time = 0.0
+    for name in args.position or POSITIONS:
+        pos, color = position_of(name)
+        references = POSITIONS[name]['counts']
+        for depth in [args.depth] if args.depth else sorted(references):
+            start = time.perf_counter()
+            nodes = perft(pos, color, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            expected = references.get(depth)
+            verdict = 'no reference' if expected is None else 'ok' if nodes == expected else f'MISMATCH, expected {expected}'
+            failures += expected is not None and nodes != expected
+            print(f"{name:<22} depth {depth:>2}  {nodes:>10} nodes  {elapsed:7.2f}s  "
+                  f"{nodes / max(elapsed, 1e-9):>10.0f} nodes/s  {verdict}")
+    print(f"total {total_nodes} nodes in {total_time:.2f}s ({total_nodes / max(total_time, 1e-9):.0f} nodes/s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Play many games offline across all cores and stream the results as NDJSON.
+
+Every move goes through ``game.play_move``, the same validation and state
+update ``update_game`` runs, on a game item that never leaves the worker.
+Players are ``bot`` (the engine, at a fixed depth or time budget) or
+``random``.  Each finished game is written as one JSON line straight away::
+
+    python benchmarks/selfplay.py --games 10000 --red bot --black random --depth 2 -o games.ndjson
+    python benchmarks/selfplay.py --games 500 --depth 4 --random-plies 4 | jq .winner
+
+A summary (games per minute, results) goes to stderr.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from cold_start import LAMBDA_DIR
+
+sys.path.insert(0, LAMBDA_DIR)
+
+import engine  # noqa: E402
+import game  # noqa: E402
+import rules  # noqa: E402
+
+PLAYERS = ('bot', 'random')
+
+
+def _quiet_worker():
+    # Log records go to stdout, which is where NDJSON may go
+    sys.stdout = open(os.devnull, 'w')
+
+
+def play_game(task):
+    """Play one game and return its result record"""
+    index, seed, players, budget_ms, depth, random_plies, max_plies = task
+    rng = random.Random(seed)
+    item = {'gameId': f'selfplay-{index}', 'currentPlayer': rules.RED, 'status': 'active'}
+    game.store_position(item, rules.INITIAL)
+    # A fresh table per game keeps fixed-depth games reproducible from the seed
+    table = {}
+    moves = []
+    nodes = 0
+    start = time.perf_counter()
+    while item['status'] != 'finished' and len(moves) < max_plies:
+        color = item['currentPlayer']
+        position = game.read_position(item)
+        legal = rules.legal_moves(position, color)
+        if not legal:
+            break
+        if players[color] == 'random' or len(moves) < random_plies:
+            move = rng.choice(legal)
+        else:
+            result = engine.search(position, color, budget_ms=budget_ms, max_depth=depth, table=table)
+            nodes += result.nodes
+            move = result.move
+        path = [rules.square_coords(sq) for sq in move]
+        game.play_move(item, path)
+        moves.append([list(square) for square in path])
+    return {
+        'game': index,
+        'seed': seed,
+        'red': players[rules.RED],
+        'black': players[rules.BLACK],
+        'winner': item.get('winner'),
+        'plies': len(moves),
+        'nodes': nodes,
+        'ms': round((time.perf_counter() - start) * 1000, 1),
+        'moves': moves
+    }
+
+
+def tasks(args):
+    players = {rules.RED: args.red, rules.BLACK: args.black}
+    for index in range(args.games):
+        yield (index, args.seed * 1000003 + index, players, args.budget_ms, args.depth,
+               args.random_plies, args.max_plies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parallel checkers self-play')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--red', choices=PLAYERS, default='bot')
+    parser.add_argument('--black', choices=PLAYERS, default='bot')
+    parser.add_argument('--depth', type=int, default=engine.MAX_DEPTH, help='bot search depth')
+    parser.add_argument('--budget-ms', type=int, default=100, help='bot time per move')
+    parser.add_argument('--random-plies', type=int, default=0,
+                        help='opening plies played at random so bot games differ')
+    parser.add_argument('--max-plies', type=int, default=300, help='count the game as a draw after this')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', default='-', help='NDJSON file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    results = Counter()
+    plies = 0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        out = sys.stdout if args.output == '-' else stack.enter_context(open(args.output, 'w'))
+        pool = stack.enter_context(multiprocessing.Pool(args.workers, initializer=_quiet_worker))
+        for record in pool.imap_unordered(play_game, tasks(args), chunksize=4):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            results[record['winner'] or 'draw'] += 1
+            plies += record['plies']
+
+    elapsed = time.perf_counter() - start
+    games = sum(results.values())
+    print(f"{games} games in {elapsed:.1f}s ({games / elapsed * 60:.0f} games/min, {args.workers} workers), "
+          f"{plies / max(games, 1):.0f} plies on average, results {dict(results)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
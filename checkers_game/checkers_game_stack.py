@@ -1,7 +1,12 @@
 from aws_cdk import (
+    BundlingOptions,
+    ILocalBundling,
     Stack,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_apigateway as apigateway,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_integrations as apigwv2_integrations,
     aws_dynamodb as dynamodb,
     aws_s3 as s3,
     aws_cloudfront as cloudfront,
@@ -15,8 +20,32 @@ from aws_cdk import (
 )
 from constructs import Construct
 from .config import Environment
+import jsii
+import os
+import shutil
+import subprocess
+import sys
 import time
 
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda")
+# Gitignored, so a checkout generates it once and later synths reuse it
+TABLEBASE_FILE = "data/endgame.cktb"
+
+
+@jsii.implements(ILocalBundling)
+class LambdaBundling:
+    """Copy lambda/ into the asset with the endgame tablebase the bot probes"""
+
+    def try_bundle(self, output_dir: str, options: BundlingOptions) -> bool:
+        table = os.path.join(LAMBDA_DIR, *TABLEBASE_FILE.split("/"))
+        if not os.path.exists(table):
+            # Solving the 4 piece endings takes a few minutes
+            subprocess.run([sys.executable, os.path.join(LAMBDA_DIR, "tablebase.py"), "--output", table], check=True)
+        shutil.copytree(LAMBDA_DIR, output_dir, dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns("__pycache__"))
+        return True
+
+
 class CheckersGameStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, env_config: Environment, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -44,16 +73,40 @@ class CheckersGameStack(Stack):
             )
         )
 
+        # Profiles of sampled or token-enabled Lambda invocations
+        profile_bucket = s3.Bucket(self, "ProfileBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            lifecycle_rules=[s3.LifecycleRule(expiration=Duration.days(14))]
+        )
+
         # DynamoDB tables with simplified configuration
         game_table = dynamodb.Table(self, "GameTable",
             partition_key=dynamodb.Attribute(
                 name="gameId",
                 type=dynamodb.AttributeType.STRING
             ),
+            # Feeds the stats Lambda below
+            stream=dynamodb.StreamViewType.NEW_IMAGE,
             removal_policy=RemovalPolicy.DESTROY,
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST
         )
 
+        # Lobby listing: games by status, most recently updated first
+        game_table.add_global_secondary_index(
+            index_name="StatusUpdatedIndex",
+            partition_key=dynamodb.Attribute(
+                name="status",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="updatedAt",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["currentPlayer", "players", "createdAt", "winner"]
+        )
+
         stats_table = dynamodb.Table(self, "StatsTable",
             partition_key=dynamodb.Attribute(
                 name="playerId",
@@ -63,6 +116,71 @@ class CheckersGameStack(Stack):
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST
         )
 
+        # Leaderboard: every ranked player in one partition, sorted by wins
+        stats_table.add_global_secondary_index(
+            index_name="LeaderboardIndex",
+            partition_key=dynamodb.Attribute(
+                name="leaderboard",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="wins",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["losses", "totalGames"]
+        )
+
+        # Open WebSocket connections, looked up by game for fan-out
+        connections_table = dynamodb.Table(self, "ConnectionsTable",
+            partition_key=dynamodb.Attribute(
+                name="connectionId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            removal_policy=RemovalPolicy.DESTROY,
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST
+        )
+
+        connections_table.add_global_secondary_index(
+            index_name="GameConnectionsIndex",
+            partition_key=dynamodb.Attribute(
+                name="gameId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="connectionId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["role"]
+        )
+
+        # Append-only move history: one item per ply, with a board snapshot every few plies
+        move_log_table = dynamodb.Table(self, "MoveLogTable",
+            partition_key=dynamodb.Attribute(
+                name="gameId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="ply",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+            removal_policy=RemovalPolicy.DESTROY,
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST
+        )
+
+        # Search results by position (Zobrist hash and side to move), shared by every container
+        analysis_table = dynamodb.Table(self, "AnalysisTable",
+            partition_key=dynamodb.Attribute(
+                name="positionKey",
+                type=dynamodb.AttributeType.STRING
+            ),
+            time_to_live_attribute="expiresAt",
+            removal_policy=RemovalPolicy.DESTROY,
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST
+        )
+
         # Lambda function with basic execution role
         lambda_role = iam.Role(self, "LambdaExecutionRole",
             assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
@@ -74,20 +192,110 @@ class CheckersGameStack(Stack):
         # Add DynamoDB permissions to Lambda role
         game_table.grant_read_write_data(lambda_role)
         stats_table.grant_read_write_data(lambda_role)
+        connections_table.grant_read_write_data(lambda_role)
+        analysis_table.grant_read_write_data(lambda_role)
+        move_log_table.grant_read_write_data(lambda_role)
+        profile_bucket.grant_put(lambda_role)
+
+        # One asset for every function; the endgame tablebase is built into it
+        # here because the file is too large to commit
+        lambda_code = lambda_.Code.from_asset(LAMBDA_DIR,
+            exclude=["**/__pycache__"],
+            bundling=BundlingOptions(
+                image=lambda_.Runtime.PYTHON_3_9.bundling_image,
+                command=["bash", "-c",
+                    f"cp -r /asset-input/. /asset-output/ && "
+                    f"(test -f /asset-output/{TABLEBASE_FILE} || "
+                    f"python /asset-output/tablebase.py --output /asset-output/{TABLEBASE_FILE})"],
+                local=LambdaBundling()
+            )
+        )
+
+        # WebSocket API: clients connect with ?gameId=... and receive every move
+        push_lambda = lambda_.Function(self, "CheckersPushFunction",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            handler="push.handler",
+            code=lambda_code,
+            environment={
+                "GAME_TABLE": game_table.table_name,
+                "CONNECTIONS_TABLE": connections_table.table_name,
+                "CONNECTIONS_INDEX": "GameConnectionsIndex",
+                "LOG_LEVEL": env_config.log_level
+            },
+            memory_size=128,
+            timeout=Duration.seconds(10),
+            role=lambda_role
+        )
+
+        push_integration = apigwv2_integrations.WebSocketLambdaIntegration("PushIntegration", push_lambda)
+        websocket_api = apigwv2.WebSocketApi(self, "CheckersWebSocketApi",
+            api_name="Checkers Game Updates",
+            connect_route_options=apigwv2.WebSocketRouteOptions(integration=push_integration),
+            disconnect_route_options=apigwv2.WebSocketRouteOptions(integration=push_integration),
+            default_route_options=apigwv2.WebSocketRouteOptions(integration=push_integration)
+        )
+        websocket_stage = apigwv2.WebSocketStage(self, "CheckersWebSocketStage",
+            web_socket_api=websocket_api,
+            stage_name=env_config.name,
+            auto_deploy=True
+        )
+        websocket_stage.grant_management_api_access(lambda_role)
 
         game_lambda = lambda_.Function(self, "CheckersGameFunction",
             runtime=lambda_.Runtime.PYTHON_3_9,
             handler="game.handler",
-            code=lambda_.Code.from_asset("lambda"),
+            code=lambda_code,
             environment={
                 "GAME_TABLE": game_table.table_name,
-                "STATS_TABLE": stats_table.table_name
+                "GAME_STATUS_INDEX": "StatusUpdatedIndex",
+                "STATS_TABLE": stats_table.table_name,
+                "LEADERBOARD_INDEX": "LeaderboardIndex",
+                "BOT_TIME_BUDGET_MS": "3000",
+                "CONNECTIONS_TABLE": connections_table.table_name,
+                "CONNECTIONS_INDEX": "GameConnectionsIndex",
+                "WEBSOCKET_ENDPOINT": websocket_stage.callback_url,
+                "ANALYSIS_TABLE": analysis_table.table_name,
+                "MOVE_LOG_TABLE": move_log_table.table_name,
+                "MOVE_SNAPSHOT_INTERVAL": "16",
+                "LOG_LEVEL": env_config.log_level,
+                "METRICS_NAMESPACE": f"CheckersGame/{env_config.name}",
+                "PROFILE_SAMPLE_RATE": str(env_config.profile_sample_rate),
+                "PROFILE_SINK": f"s3://{profile_bucket.bucket_name}/profiles/",
+                "STATS_FROM_STREAM": "true"
             },
             memory_size=256,
             timeout=Duration.seconds(30),
             role=lambda_role
         )
 
+        # Finished games reach the players' stats through the game table's
+        # stream; failed records are retried instead of dropped
+        stats_lambda = lambda_.Function(self, "CheckersStatsFunction",
+            runtime=lambda_.Runtime.PYTHON_3_9,
+            handler="stats.handler",
+            code=lambda_code,
+            environment={
+                "GAME_TABLE": game_table.table_name,
+                "GAME_STATUS_INDEX": "StatusUpdatedIndex",
+                "STATS_TABLE": stats_table.table_name,
+                "LEADERBOARD_INDEX": "LeaderboardIndex",
+                "LOG_LEVEL": env_config.log_level
+            },
+            memory_size=128,
+            timeout=Duration.seconds(30),
+            role=lambda_role
+        )
+        stats_lambda.add_event_source(lambda_event_sources.DynamoEventSource(game_table,
+            starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+            batch_size=25,
+            retry_attempts=100,
+            report_batch_item_failures=True,
+            filters=[lambda_.FilterCriteria.filter({
+                "eventName": lambda_.FilterRule.or_("INSERT", "MODIFY"),
+                "dynamodb": {"NewImage": {"status": {"S": lambda_.FilterRule.is_equal("finished")}}}
+            })]
+        ))
+
         # API Gateway with simplified configuration
         api = apigateway.RestApi(self, "CheckersApi",
             rest_api_name="Checkers Game API",
@@ -98,27 +306,69 @@ class CheckersGameStack(Stack):
         api.root.add_method("ANY", game_integration)
         api.root.add_proxy(default_integration=game_integration)
 
+        # Game reads through CloudFront: nothing is cached unless the API says
+        # so, which it does for finished games (immutable) and, with an ETag
+        # to revalidate against, for active ones
+        api_cache_policy = cloudfront.CachePolicy(self, "GameApiCachePolicy",
+            default_ttl=Duration.seconds(0),
+            min_ttl=Duration.seconds(0),
+            max_ttl=Duration.days(365),
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.all(),
+            header_behavior=cloudfront.CacheHeaderBehavior.none(),
+            cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+        # Client-side routes of the single-page app are served index.html.
+        # This runs on the S3 behaviour only: distribution-wide error responses
+        # would also turn the API's 403s and 404s into index.html.
+        spa_rewrite = cloudfront.Function(self, "SpaRewriteFunction",
+            code=cloudfront.FunctionCode.from_inline(
+                "function handler(event) {\n"
+                "  var request = event.request;\n"
+                "  if (request.uri.indexOf('.') === -1) {\n"
+                "    request.uri = '/index.html';\n"
+                "  }\n"
+                "  return request;\n"
+                "}\n"
+            )
+        )
+
+        api_origin = origins.RestApiOrigin(api)
+        uncached_api_behavior = cloudfront.BehaviorOptions(
+            origin=api_origin,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+            cache_policy=cloudfront.CachePolicy.CACHING_DISABLED,
+            origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER
+        )
+
         # CloudFront distribution with simplified configuration
         distribution = cloudfront.Distribution(self, "CheckersDistribution",
             default_behavior=cloudfront.BehaviorOptions(
                 origin=origins.S3BucketOrigin(website_bucket),
                 viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
                 allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
-                cache_policy=cloudfront.CachePolicy.CACHING_DISABLED
+                cache_policy=cloudfront.CachePolicy.CACHING_DISABLED,
+                function_associations=[cloudfront.FunctionAssociation(
+                    function=spa_rewrite,
+                    event_type=cloudfront.FunctionEventType.VIEWER_REQUEST
+                )]
             ),
-            default_root_object="index.html",
-            error_responses=[
-                cloudfront.ErrorResponse(
-                    http_status=403,
-                    response_http_status=200,
-                    response_page_path="/index.html"
+            # The frontend calls the API on this domain
+            additional_behaviors={
+                "/games*": cloudfront.BehaviorOptions(
+                    origin=api_origin,
+                    viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                    allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                    cache_policy=api_cache_policy,
+                    origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER
                 ),
-                cloudfront.ErrorResponse(
-                    http_status=404,
-                    response_http_status=200,
-                    response_page_path="/index.html"
-                )
-            ]
+                "/stats": uncached_api_behavior,
+                "/leaderboard": uncached_api_behavior
+            },
+            default_root_object="index.html"
         )
 
         # Deploy frontend to S3
@@ -140,3 +390,7 @@ class CheckersGameStack(Stack):
         CfnOutput(self, "APIGatewayURL",
             value=api.url
         )
+
+        CfnOutput(self, "WebSocketURL",
+            value=websocket_stage.url
+        )
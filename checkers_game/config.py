@@ -6,10 +6,13 @@ class Environment:
     name: str
     domain_name: str = None
     certificate_arn: str = None
+    log_level: str = "WARNING"
+    profile_sample_rate: float = 0.0
 
 class Config:
     DEV = Environment(
         name="dev",
+        log_level="INFO",
     )
     
     PROD = Environment(
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 
 interface GameState {
   gameId: string;
@@ -9,6 +9,12 @@ interface GameState {
   createdAt: string;
   updatedAt: string;
   hasMoreJumps?: boolean;
+  legalMoves?: LegalMove[];
+}
+
+interface LegalMove {
+  path: number[][];
+  captures: number[][];
 }
 
 interface Square {
@@ -26,8 +32,27 @@ function App() {
   const [game, setGame] = useState<GameState | null>(null);
   const [selectedSquare, setSelectedSquare] = useState<Square | null>(null);
   const [validMoves, setValidMoves] = useState<Move[]>([]);
-  const [jumpingPiece, setJumpingPiece] = useState<Square | null>(null);
-  const apiEndpoint = 'https://w9cqnnyhbi.execute-api.us-east-1.amazonaws.com/prod';
+  const [pendingPath, setPendingPath] = useState<Move[]>([]);
+  // Requests go through the CloudFront distribution that serves the app, so
+  // repeated game reads can be answered at the edge. Set REACT_APP_API_ENDPOINT
+  // to use another deployment, e.g. the CloudFrontURL output under `npm start`.
+  const apiEndpoint = process.env.REACT_APP_API_ENDPOINT || '';
+  // WebSocketURL output of the stack; moves made by the other side arrive here
+  const wsEndpoint = process.env.REACT_APP_WS_ENDPOINT;
+  const gameId = game?.gameId;
+
+  useEffect(() => {
+    if (!wsEndpoint || !gameId) return;
+
+    const socket = new WebSocket(`${wsEndpoint}?gameId=${encodeURIComponent(gameId)}`);
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'gameUpdated' && message.gameId === gameId) {
+        setGame(message);
+      }
+    };
+    return () => socket.close();
+  }, [wsEndpoint, gameId]);
 
   const getGameStatus = () => {
     if (!game) {
@@ -45,7 +70,7 @@ function App() {
 
   const createNewGame = async () => {
     try {
-      const response = await fetch(`${apiEndpoint}/games`, {
+      const response = await fetch(`${apiEndpoint}/games?includeMoves=true`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -72,6 +97,7 @@ function App() {
       
       setSelectedSquare(null);
       setValidMoves([]);
+      setPendingPath([]);
       
     } catch (error) {
       console.error('Error creating game:', error);
@@ -92,156 +118,32 @@ function App() {
     return count;
   };
 
-  const checkWinner = (): string | null => {
-    if (!game || !game.board) return null;
-    
-    const redPieces = countPieces('r');
-    const blackPieces = countPieces('b');
-
-    console.log('Piece count check:', { 
-      red: redPieces, 
-      black: blackPieces,
-      board: game.board
-    });
+  const isPrefixOf = (prefix: Move[], path: number[][]): boolean =>
+    path.length >= prefix.length &&
+    prefix.every((square, i) => path[i][0] === square.row && path[i][1] === square.col);
 
-    if (redPieces === 0) return 'black';
-    if (blackPieces === 0) return 'red';
-    return null;
-  };
-
-  const calculateValidMoves = (row: number, col: number): Move[] => {
-    if (!game) return [];
-    
-    const piece = game.board[row][col];
-    if (!piece) return [];
+  // Squares the piece can go to next, taken from the server's legal move list
+  const nextSquares = (prefix: Move[]): Move[] => {
+    if (!game?.legalMoves) return [];
 
-    console.log('Calculating moves for piece:', {
-      row,
-      col,
-      piece,
-      isKing: piece === piece.toUpperCase(),
-      isBlackSquare: (row + col) % 2 === 0
-    });
-    
-    const isKing = piece === piece.toUpperCase();
     const moves: Move[] = [];
-
-    // Determine valid directions based on piece type and color
-    const directions: number[] = [];
-    if (piece.toLowerCase() === 'r') {
-      directions.push(-1); // Red pieces move up
-    } else if (piece.toLowerCase() === 'b') {
-      directions.push(1);  // Black pieces move down
-    }
-    if (isKing) {
-      // Kings can move both up and down
-      if (!directions.includes(-1)) directions.push(-1);
-      if (!directions.includes(1)) directions.push(1);
-    }
-
-    console.log('Movement directions:', directions);
-
-    // First check for jumps (these are mandatory)
-    const jumps: Move[] = [];
-    for (const rowDir of directions) {
-      for (const colDir of [-1, 1]) { // Left and right
-        const jumpedRow = row + rowDir;
-        const jumpedCol = col + colDir;
-        const newRow = row + (rowDir * 2);
-        const newCol = col + (colDir * 2);
-
-        console.log('Checking jump:', {
-          from: { row, col },
-          over: { row: jumpedRow, col: jumpedCol, piece: game?.board[jumpedRow]?.[jumpedCol] },
-          to: { row: newRow, col: newCol },
-          isBlackSquare: (newRow + newCol) % 2 === 0
-        });
-
-        // Check if jump is within bounds
-        if (newRow < 0 || newRow > 7 || newCol < 0 || newCol > 7) {
-          console.log('Jump out of bounds');
-          continue;
-        }
-        
-        // Check if there's an opponent's piece to jump over
-        const jumpedPiece = game?.board[jumpedRow][jumpedCol];
-        if (!jumpedPiece) {
-          console.log('No piece to jump over');
-          continue;
-        }
-        
-        // Check if landing square is empty
-        if (game?.board[newRow][newCol]) {
-          console.log('Landing square occupied');
-          continue;
-        }
-        
-        const isOpponentPiece = 
-          (piece.toLowerCase() === 'r' && jumpedPiece.toLowerCase() === 'b') ||
-          (piece.toLowerCase() === 'b' && jumpedPiece.toLowerCase() === 'r');
-
-        console.log('Jump validation:', {
-          isOpponentPiece,
-          isBlackSquare: (newRow + newCol) % 2 === 0
-        });
-
-        // Only allow jumps over opponent's pieces to black squares
-        if (isOpponentPiece && (newRow + newCol) % 2 === 0) {
-          jumps.push({ row: newRow, col: newCol });
-          console.log('Valid jump found:', { row: newRow, col: newCol });
-        }
+    for (const { path } of game.legalMoves) {
+      if (path.length <= prefix.length || !isPrefixOf(prefix, path)) continue;
+      const [row, col] = path[prefix.length];
+      if (!moves.some(move => move.row === row && move.col === col)) {
+        moves.push({ row, col });
       }
     }
+    return moves;
+  };
 
-    // If there are jumps available, they are mandatory
-    if (jumps.length > 0) {
-      console.log('Mandatory jumps found:', jumps);
-      return jumps;
-    }
-
-    // If no jumps are available, check for regular moves
-    for (const rowDir of directions) {
-      for (const colDir of [-1, 1]) { // Left and right
-        const newRow = row + rowDir;
-        const newCol = col + colDir;
-
-        console.log('Checking regular move:', {
-          from: { row, col },
-          to: { row: newRow, col: newCol },
-          isBlackSquare: (newRow + newCol) % 2 === 0
-        });
-
-        // Check if move is within bounds
-        if (newRow < 0 || newRow > 7 || newCol < 0 || newCol > 7) {
-          console.log('Move out of bounds');
-          continue;
-        }
-        
-        // Check if destination square is empty
-        if (game?.board[newRow][newCol]) {
-          console.log('Destination square occupied');
-          continue;
-        }
-
-        // Only allow moves to black squares
-        const isBlackSquare = (newRow + newCol) % 2 === 0;
-        console.log('Square color check:', {
-          newRow,
-          newCol,
-          sum: newRow + newCol,
-          isBlackSquare
-        });
+  const isCompleteMove = (prefix: Move[]): boolean =>
+    !!game?.legalMoves?.some(({ path }) => path.length === prefix.length && isPrefixOf(prefix, path));
 
-        if (isBlackSquare) {
-          moves.push({ row: newRow, col: newCol });
-          console.log('Valid move found:', { row: newRow, col: newCol });
-        } else {
-          console.log('Not a black square');
-        }
-      }
-    }
-    console.log('Final valid moves:', moves);
-    return moves;
+  const clearSelection = () => {
+    setSelectedSquare(null);
+    setValidMoves([]);
+    setPendingPath([]);
   };
 
   const handleSquareClick = (row: number, col: number) => {
@@ -249,46 +151,50 @@ function App() {
 
     const piece = game.board[row][col];
     console.log('Clicked square:', { row, col, piece });
-    console.log('Game state:', { currentPlayer: game.currentPlayer, selectedSquare, validMoves });
+    console.log('Game state:', { currentPlayer: game.currentPlayer, selectedSquare, validMoves, pendingPath });
 
-    // If there's a jumping piece, only allow that piece to move
-    if (jumpingPiece && (row !== jumpingPiece.row || col !== jumpingPiece.col) && piece?.toLowerCase() === game.currentPlayer[0]) {
-      console.log('Must continue jump with piece at:', jumpingPiece);
+    // A capture chain in progress can only be continued, not changed
+    if (pendingPath.length > 1 && !validMoves.some(move => move.row === row && move.col === col)) {
+      console.log('Must continue jump with piece at:', selectedSquare);
       return;
     }
 
     // If it's a piece of the current player's color
     if (piece && piece.toLowerCase() === game.currentPlayer[0]) {
+      const start = [{ row, col }];
       setSelectedSquare({ row, col, piece });
-      const moves = calculateValidMoves(row, col);
-      setValidMoves(moves);
-      console.log('Calculated valid moves:', moves);
+      setPendingPath(start);
+      setValidMoves(nextSquares(start));
     }
-    // If it's a valid move for the selected piece
+    // If it's a valid next square for the selected piece
     else if (selectedSquare && validMoves.some(move => move.row === row && move.col === col)) {
-      handleMove(row, col);
+      const path = [...pendingPath, { row, col }];
+      if (isCompleteMove(path)) {
+        handleMove(path);
+      } else {
+        // Keep collecting the capture chain and send it in one request
+        setSelectedSquare({ row, col, piece: selectedSquare.piece });
+        setPendingPath(path);
+        setValidMoves(nextSquares(path));
+      }
     }
     // Deselect if clicking elsewhere
     else {
-      setSelectedSquare(null);
-      setValidMoves([]);
+      clearSelection();
     }
   };
 
-  const handleMove = async (toRow: number, toCol: number) => {
-    if (!selectedSquare || !game) return;
+  const handleMove = async (path: Move[]) => {
+    if (!game) return;
 
     try {
-      const response = await fetch(`${apiEndpoint}/games/${game.gameId}`, {
+      const response = await fetch(`${apiEndpoint}/games/${game.gameId}?includeMoves=true`, {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          fromRow: selectedSquare.row,
-          fromCol: selectedSquare.col,
-          toRow,
-          toCol
+          path: path.map(({ row, col }) => [row, col])
         }),
       });
 
@@ -297,77 +203,11 @@ function App() {
       }
 
       const updatedGame = await response.json();
-      
-      // Check for winner after move
-      const winner = checkWinner();
-      if (winner) {
-        console.log('Winner found:', winner);
-        const finalGame = {
-          ...updatedGame,
-          status: 'finished',
-          winner
-        };
-        console.log('Setting final game state:', finalGame);
-        setGame(finalGame);
-        
-        // Update the game status on the server
-        try {
-          const updateResponse = await fetch(`${apiEndpoint}/games/${game.gameId}`, {
-            method: 'PUT',
-            headers: {
-              'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-              status: 'finished',
-              winner
-            }),
-          });
-          
-          if (!updateResponse.ok) {
-            console.error('Failed to update game status on server');
-          }
-        } catch (error) {
-          console.error('Error updating game status:', error);
-        }
-        
-        setSelectedSquare(null);
-        setValidMoves([]);
-        setJumpingPiece(null);
-        return;
-      }
-
       setGame(updatedGame);
-
-      // Check if this was a jump move
-      const isJump = Math.abs(toRow - selectedSquare.row) === 2;
-
-      if (isJump) {
-        // Check for additional jumps from the new position
-        const additionalJumps = calculateValidMoves(toRow, toCol).filter(move => 
-          Math.abs(move.row - toRow) === 2
-        );
-
-        if (additionalJumps.length > 0) {
-          // If there are more jumps available, keep the piece selected
-          const jumpingPiece = { 
-            row: toRow, 
-            col: toCol, 
-            piece: updatedGame.board[toRow][toCol]
-          };
-          setSelectedSquare(jumpingPiece);
-          setValidMoves(additionalJumps);
-          setJumpingPiece(jumpingPiece);
-          return;
-        }
-      }
-
-      // If no additional jumps or not a jump move, clear selection
-      setSelectedSquare(null);
-      setValidMoves([]);
-      setJumpingPiece(null);
     } catch (error) {
       console.error('Error making move:', error);
     }
+    clearSelection();
   };
 
   return (
@@ -0,0 +1,126 @@
+"""Search results shared across games, containers and invocations.
+
+Openings, common trades and standard endgames come up in thousands of
+games, so a finished search is worth keeping.  Results are stored in the
+analysis table under the position's Zobrist hash and the side to move, and
+an LRU in each warm container sits in front of it, so a repeated position
+costs a dictionary lookup instead of a search.
+
+A stored result is only replaced by a deeper one: the write is conditional
+on the stored ``depth`` being lower.  Entries expire after
+``ANALYSIS_TTL_DAYS`` through the table's TTL, so evaluation changes
+eventually reach every position.  The packed board is kept with each entry
+and compared on read, so a hash collision is a miss, not a wrong answer.
+"""
+import os
+import time
+
+import cache
+import engine
+import log
+import rules
+import storage
+
+analysis_table = storage.table(os.environ.get('ANALYSIS_TABLE', 'AnalysisTable'), key='positionKey')
+
+ANALYSIS_TTL_DAYS = int(os.environ.get('ANALYSIS_TTL_DAYS', '30'))
+# Cached results shallower than this are searched again
+ANALYSIS_MIN_DEPTH = int(os.environ.get('ANALYSIS_MIN_DEPTH', '6'))
+# Part of a search budget, in milliseconds, kept back for the table write
+ANALYSIS_WRITE_RESERVE_MS = int(os.environ.get('ANALYSIS_WRITE_RESERVE_MS', '15'))
+
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '4096'))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS', '3600'))
+analysis_cache = cache.LRUCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL_SECONDS)
+
+
+def position_key(pos, color):
+    """Table key of a position: its Zobrist hash and the side to move"""
+    return f'{engine.zobrist_hash(pos, color):016x}-{color}'
+
+
+def _to_result(item):
+    return engine.SearchResult(
+        tuple(int(sq) for sq in item['move']),
+        int(item['score']),
+        int(item['depth']),
+        0,
+        [tuple(int(sq) for sq in move) for move in item.get('pv', [])]
+    )
+
+
+def lookup(pos, color, min_depth=0):
+    """The stored result for a position searched at least ``min_depth`` deep, or ``None``"""
+    key = position_key(pos, color)
+    packed = rules.to_packed(pos)
+    item = analysis_cache.get(key)
+    if item is None:
+        with log.phase('analysisRead'):
+            item = analysis_table.get({'positionKey': key})
+        # DynamoDB deletes expired items up to a few days late
+        if item is None or int(item.get('expiresAt', 0)) < time.time():
+            return None
+        analysis_cache.put(key, item)
+    if item['packedBoard'] != packed or int(item['depth']) < min_depth:
+        return None
+    return _to_result(item)
+
+
+def store(pos, color, result, deadline=None):
+    """Keep a search result unless an equal or deeper one is already stored"""
+    if result.move is None or result.depth <= 0:
+        return
+    key = position_key(pos, color)
+    item = {
+        'positionKey': key,
+        'packedBoard': rules.to_packed(pos),
+        'move': list(result.move),
+        'score': result.score,
+        'depth': result.depth,
+        'pv': [list(move) for move in result.pv],
+        'expiresAt': int(time.time()) + ANALYSIS_TTL_DAYS * 24 * 60 * 60
+    }
+    cached = analysis_cache.get(key)
+    if cached is None or int(cached['depth']) < result.depth or cached['packedBoard'] != item['packedBoard']:
+        analysis_cache.put(key, item)
+    # Past the caller's deadline the write would only add to its latency
+    if deadline is not None and time.perf_counter() >= deadline:
+        log.debug('Analysis not written; budget spent', positionKey=key)
+        return
+    try:
+        with log.phase('analysisWrite'):
+            analysis_table.update(
+                {'positionKey': key},
+                set={name: value for name, value in item.items() if name != 'positionKey'},
+                below={'depth': result.depth}
+            )
+    except storage.ConditionFailed:
+        log.debug('Deeper analysis already stored', positionKey=key)
+    except Exception as e:
+        # The cache is an optimisation; a failed write must not fail the move
+        log.error('Error storing analysis', positionKey=key, error=str(e))
+
+
+def analyse(pos, color, budget_ms, min_depth=ANALYSIS_MIN_DEPTH):
+    """``engine.search``, answered from the shared cache when it is deep enough.
+
+    A stored result shallower than ``min_depth`` is still returned when the
+    new search does not get as deep.  The cache lookup and the write of the
+    new result come out of ``budget_ms`` too.  Returns the search result and
+    whether it came from the cache.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    try:
+        known = lookup(pos, color)
+    except Exception as e:
+        log.error('Error reading analysis', error=str(e))
+        known = None
+    if known is not None and known.depth >= min_depth:
+        return known, True
+    remaining_ms = (deadline - time.perf_counter()) * 1000
+    search_ms = max(remaining_ms - min(ANALYSIS_WRITE_RESERVE_MS, remaining_ms / 4), 1)
+    result = engine.search(pos, color, budget_ms=search_ms)
+    if known is not None and known.depth > result.depth:
+        return known, True
+    store(pos, color, result, deadline)
+    return result, False
@@ -0,0 +1,162 @@
+"""Thin DynamoDB table wrapper on the low-level client.
+
+``boto3.resource`` is the slowest part of boto3 to import and initialise and
+its TypeSerializer/TypeDeserializer are generic.  Our items only hold
+strings, numbers, booleans, nulls, maps and lists, so a few small functions
+cover the marshalling, and the client itself is only created on the first
+call that needs it.
+"""
+from decimal import Decimal
+
+_client = None
+
+
+def client():
+    """Create the DynamoDB client on first use and reuse it afterwards"""
+    global _client
+    if _client is None:
+        import boto3
+        _client = boto3.client('dynamodb')
+    return _client
+
+
+class ConditionFailed(Exception):
+    """A write's ConditionExpression did not hold"""
+
+
+def serialize(value):
+    """Convert a Python value into a DynamoDB AttributeValue"""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        return {'N': repr(value)}
+    if isinstance(value, dict):
+        return {'M': {key: serialize(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(item) for item in value]}
+    raise TypeError(f"Cannot store {type(value).__name__} in DynamoDB")
+
+
+def deserialize(attribute):
+    """Convert a DynamoDB AttributeValue back into a Python value"""
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return int(value) if value.lstrip('-').isdigit() else Decimal(value)
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'M':
+        return {key: deserialize(item) for key, item in value.items()}
+    if kind == 'L':
+        return [deserialize(item) for item in value]
+    if kind == 'SS':
+        return set(value)
+    raise TypeError(f"Unsupported attribute type {kind}")
+
+
+def serialize_item(item):
+    return {key: serialize(value) for key, value in item.items()}
+
+
+def deserialize_item(item):
+    return {key: deserialize(value) for key, value in item.items()}
+
+
+def _is_condition_failure(error):
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    if code == 'TransactionCanceledException':
+        return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in response.get('CancellationReasons', []))
+    return code == 'ConditionalCheckFailedException'
+
+
+def _marshal(kwargs):
+    """Marshal the keys, items and expression values of a request in place"""
+    for field in ('Key', 'Item', 'ExclusiveStartKey', 'ExpressionAttributeValues'):
+        if field in kwargs:
+            kwargs[field] = serialize_item(kwargs[field])
+    return kwargs
+
+
+def transact_write(items):
+    """Run ``TransactWriteItems`` on requests written with plain Python values"""
+    request = [{action: _marshal(dict(params)) for action, params in item.items()} for item in items]
+    try:
+        client().transact_write_items(TransactItems=request)
+    except Exception as e:
+        if _is_condition_failure(e):
+            raise ConditionFailed(str(e)) from e
+        raise
+
+
+def batch_get(request_items):
+    """Run one ``BatchGetItem`` call.
+
+    ``request_items`` is ``{table: {'Keys': [...], ...}}`` with plain keys.
+    Returns ``(items by table, unprocessed request items)``, both plain.
+    """
+    request = {table: {**params, 'Keys': [serialize_item(key) for key in params['Keys']]}
+               for table, params in request_items.items()}
+    response = client().batch_get_item(RequestItems=request)
+    items = {table: [deserialize_item(item) for item in found] for table, found in response.get('Responses', {}).items()}
+    unprocessed = {
+        table: {**params, 'Keys': [deserialize_item(key) for key in params['Keys']]}
+        for table, params in response.get('UnprocessedKeys', {}).items()
+    }
+    return items, unprocessed
+
+
+class Table:
+    """The subset of ``boto3.resource('dynamodb').Table`` the game uses.
+
+    Arguments and results use plain Python values; expression attribute
+    values, keys and items are marshalled here.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _call(self, operation, **kwargs):
+        _marshal(kwargs)
+        try:
+            return getattr(client(), operation)(TableName=self.name, **kwargs)
+        except Exception as e:
+            if _is_condition_failure(e):
+                raise ConditionFailed(str(e)) from e
+            raise
+
+    def get_item(self, **kwargs):
+        response = self._call('get_item', **kwargs)
+        if 'Item' in response:
+            return {'Item': deserialize_item(response['Item'])}
+        return {}
+
+    def put_item(self, **kwargs):
+        self._call('put_item', **kwargs)
+        return {}
+
+    def delete_item(self, **kwargs):
+        self._call('delete_item', **kwargs)
+        return {}
+
+    def update_item(self, **kwargs):
+        response = self._call('update_item', **kwargs)
+        if 'Attributes' in response:
+            return {'Attributes': deserialize_item(response['Attributes'])}
+        return {}
+
+    def query(self, **kwargs):
+        response = self._call('query', **kwargs)
+        result = {'Items': [deserialize_item(item) for item in response.get('Items', [])]}
+        if 'LastEvaluatedKey' in response:
+            result['LastEvaluatedKey'] = deserialize_item(response['LastEvaluatedKey'])
+        return result
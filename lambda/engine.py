@@ -0,0 +1,262 @@
+"""Computer opponent: iterative-deepening alpha-beta over the bitboard rules.
+
+The search is a negamax alpha-beta with a Zobrist-hashed transposition table
+that survives between warm invocations, so a bot replying to the same game
+again starts from the previous search.  Moves come straight from
+``rules.legal_moves``, which keeps the engine and ``update_game`` on exactly
+the same rules.
+"""
+import random
+import time
+from collections import namedtuple
+
+import rules
+import tablebase
+
+# Scores are from the side to move's point of view; anything beyond
+# MATE_THRESHOLD is a forced result rather than an evaluation
+WIN_SCORE = 100000
+MATE_THRESHOLD = WIN_SCORE - 1000
+MAN_VALUE = 100
+KING_VALUE = 160
+BACK_ROW_BONUS = 8
+CENTER_BONUS = 4
+
+# Transposition table bound; the table is cleared once it reaches this size
+MAX_TABLE_ENTRIES = 200000
+# Hard depth cap so a nearly empty board does not loop on tiny searches
+MAX_DEPTH = 64
+# Nodes searched between two looks at the clock; a node costs some 20us in
+# CPython, so the search stops within about a millisecond of its deadline
+CLOCK_INTERVAL = 64
+
+EXACT, LOWER, UPPER = range(3)
+
+# Four central squares of rows 3 and 4
+CENTER = (1 << 13) | (1 << 14) | (1 << 17) | (1 << 18)
+
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes', 'pv'])
+
+
+def _zobrist_keys(seed=0x5EED):
+    rng = random.Random(seed)
+    keys = {piece: [rng.getrandbits(64) for _ in range(32)] for piece in 'rbRB'}
+    return keys, rng.getrandbits(64)
+
+
+ZOBRIST, BLACK_TO_MOVE = _zobrist_keys()
+
+
+def _piece_on(pos, s):
+    bit = 1 << s
+    if pos.red & bit:
+        return 'R' if pos.kings & bit else 'r'
+    if pos.black & bit:
+        return 'B' if pos.kings & bit else 'b'
+    return None
+
+
+def zobrist_hash(pos, color):
+    """Hash a position and side to move into a 64-bit integer"""
+    h = BLACK_TO_MOVE if color == rules.BLACK else 0
+    for s in rules.bits(pos.red | pos.black):
+        h ^= ZOBRIST[_piece_on(pos, s)][s]
+    return h
+
+
+def _rehash(h, before, after):
+    """Update a hash for the squares that differ between two positions"""
+    changed = (before.red ^ after.red) | (before.black ^ after.black) | (before.kings ^ after.kings)
+    for s in rules.bits(changed):
+        old = _piece_on(before, s)
+        if old:
+            h ^= ZOBRIST[old][s]
+        new = _piece_on(after, s)
+        if new:
+            h ^= ZOBRIST[new][s]
+    return h ^ BLACK_TO_MOVE
+
+
+def make_move(pos, color, move):
+    """Apply a full move (tuple of squares) and return the new Position"""
+    for hop_from, hop_to in zip(move, move[1:]):
+        pos, _, _ = rules.apply_step(pos, hop_from, hop_to, color)
+    return pos
+
+
+def _to_table(score, ply):
+    """A forced result counted from this node instead of the root, for the table"""
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply):
+    """A stored score counted from the root of the current search again"""
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def _popcount(bb):
+    return bin(bb).count('1')
+
+
+def evaluate(pos, color):
+    """Static evaluation of ``pos`` from ``color``'s point of view"""
+    red_kings = pos.red & pos.kings
+    black_kings = pos.black & pos.kings
+    score = (
+        MAN_VALUE * (_popcount(pos.red ^ red_kings) - _popcount(pos.black ^ black_kings))
+        + KING_VALUE * (_popcount(red_kings) - _popcount(black_kings))
+        + BACK_ROW_BONUS * (_popcount(pos.red & rules.BOTTOM_ROW) - _popcount(pos.black & rules.TOP_ROW))
+        + CENTER_BONUS * (_popcount(pos.red & CENTER) - _popcount(pos.black & CENTER))
+    )
+    return score if color == rules.RED else -score
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """One search: holds the clock, the node counter and the shared tables"""
+
+    def __init__(self, table, deadline, endgame=None, root_moves=None):
+        self.table = table
+        self.deadline = deadline
+        self.endgame = endgame
+        self.root_moves = root_moves
+        self.nodes = 0
+
+    def negamax(self, pos, color, h, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            raise _Timeout()
+
+        # Few pieces left: the tablebase knows the exact result
+        if self.endgame is not None and ply and _popcount(pos.red | pos.black) <= self.endgame.max_pieces:
+            known = self.endgame.probe(pos, color)
+            if known is not None:
+                result, distance = known
+                if result == tablebase.WIN:
+                    return WIN_SCORE - ply - distance
+                if result == tablebase.LOSS:
+                    return -WIN_SCORE + ply + distance
+                return 0
+
+        original_alpha = alpha
+        entry = self.table.get(h)
+        best_move = None
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, best_move = entry
+            # The same position is reached at different plies
+            entry_score = _from_table(entry_score, ply)
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif entry_flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        moves = list(self.root_moves) if ply == 0 and self.root_moves else rules.legal_moves(pos, color)
+        if not moves:
+            return -WIN_SCORE + ply
+        # Captures are forced anyway; never stop the search in the middle of an exchange
+        if depth <= 0 and len(moves[0]) == 2 and not rules.is_jump(*moves[0]):
+            return evaluate(pos, color)
+
+        # Move ordering: table move first, then longer capture chains
+        moves.sort(key=len, reverse=True)
+        if best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        other = rules.opponent(color)
+        best_score = -WIN_SCORE - 1
+        for move in moves:
+            child = make_move(pos, color, move)
+            score = -self.negamax(child, other, _rehash(h, pos, child), depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if len(self.table) >= MAX_TABLE_ENTRIES:
+            self.table.clear()
+        self.table[h] = (depth, _to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def principal_variation(self, pos, color, h, length):
+        """Follow the table's best moves from the root"""
+        pv = []
+        seen = set()
+        while len(pv) < length and h not in seen:
+            seen.add(h)
+            entry = self.table.get(h)
+            if entry is None or entry[3] is None or entry[3] not in rules.legal_moves(pos, color):
+                break
+            move = entry[3]
+            pv.append(move)
+            child = make_move(pos, color, move)
+            h = _rehash(h, pos, child)
+            pos, color = child, rules.opponent(color)
+        return pv
+
+
+# Shared across warm invocations of the same container
+_table = {}
+
+
+def search(pos, color, budget_ms=1000, max_depth=MAX_DEPTH, table=None, endgame=None, from_sq=None):
+    """Find the best move for ``color`` within ``budget_ms`` milliseconds.
+
+    Deepens one ply at a time and returns the result of the deepest search
+    that finished before the budget ran out.  A position with a single legal
+    move is answered without searching.  ``move`` is ``None`` when ``color``
+    has no legal move.  ``endgame`` defaults to the tablebase shipped with
+    the Lambda asset, when there is one.  ``from_sq`` limits the search to
+    the moves of the piece that has to finish a capture chain.
+    """
+    start = time.perf_counter()
+    if endgame is None:
+        endgame = tablebase.default_tablebase()
+    moves = rules.legal_moves(pos, color, from_sq)
+    if table is None:
+        # A restricted root would leave a misleading score for this position
+        # in the shared table
+        table = _table if from_sq is None else {}
+    searcher = Searcher(table, start + budget_ms / 1000.0, endgame, moves if from_sq is not None else None)
+    if not moves:
+        return SearchResult(None, -WIN_SCORE, 0, 0, [])
+    if len(moves) == 1:
+        return SearchResult(moves[0], evaluate(pos, color), 0, 0, [moves[0]])
+
+    h = zobrist_hash(pos, color)
+    result = SearchResult(moves[0], evaluate(pos, color), 0, 0, [moves[0]])
+    for depth in range(1, max_depth + 1):
+        try:
+            score = searcher.negamax(pos, color, h, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 0)
+        except _Timeout:
+            break
+        pv = searcher.principal_variation(pos, color, h, depth) or [result.move]
+        result = SearchResult(pv[0], score, depth, searcher.nodes, pv)
+        # A forced win or loss inside the horizon will not change with more depth
+        if abs(score) >= MATE_THRESHOLD:
+            break
+    return result._replace(nodes=searcher.nodes)
@@ -1,13 +1,160 @@
 import os
 import json
 import uuid
-import boto3
+import base64
+import copy
+import time
 from datetime import datetime
+from decimal import Decimal
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-game_table = dynamodb.Table(os.environ['GAME_TABLE'])
-stats_table = dynamodb.Table(os.environ['STATS_TABLE'])
+import cache
+import log
+import profiling
+import push
+import rules
+import storage
+
+# Attributes the status index projects besides its keys (see the CDK stack)
+GAME_INDEX_ATTRIBUTES = ('currentPlayer', 'players', 'createdAt', 'winner')
+
+# Tables on the backend chosen by STORAGE_BACKEND; the DynamoDB client behind
+# them is only created on first use
+game_status_index = os.environ.get('GAME_STATUS_INDEX', 'StatusUpdatedIndex')
+game_table = storage.table(
+    os.environ.get('GAME_TABLE', 'GameTable'),
+    key='gameId',
+    indexes={game_status_index: ('status', 'updatedAt', GAME_INDEX_ATTRIBUTES)}
+)
+# One small item per move, so the game item does not grow with its history
+move_log_table = storage.table(os.environ.get('MOVE_LOG_TABLE', 'MoveLogTable'), key='gameId', sort_key='ply')
+leaderboard_index = os.environ.get('LEADERBOARD_INDEX', 'LeaderboardIndex')
+stats_table = storage.table(
+    os.environ.get('STATS_TABLE', 'StatsTable'),
+    key='playerId',
+    indexes={leaderboard_index: ('leaderboard', 'wins', ('losses', 'totalGames'))}
+)
+
+# Seat value for the computer opponent and its thinking time per move
+BOT_PLAYER = 'bot'
+BOT_TIME_BUDGET_MS = int(os.environ.get('BOT_TIME_BUDGET_MS', '2000'))
+
+# Page size bounds for GET /games
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Warm-container cache of game items, keyed by (gameId, version)
+GAME_CACHE_SIZE = int(os.environ.get('GAME_CACHE_SIZE', '1024'))
+GAME_CACHE_TTL_SECONDS = int(os.environ.get('GAME_CACHE_TTL_SECONDS', '300'))
+game_cache = cache.LRUCache(GAME_CACHE_SIZE, GAME_CACHE_TTL_SECONDS)
+# Version slot under which finished games are cached; they never change again
+FINAL_VERSION = 'final'
+
+# Seconds an active game's response may be reused by CloudFront and
+# browsers, and by GET in this container without reading the table
+ACTIVE_GAME_MAX_AGE_SECONDS = int(os.environ.get('ACTIVE_GAME_MAX_AGE_SECONDS', '2'))
+# Latest version of each game seen here, for ACTIVE_GAME_MAX_AGE_SECONDS
+latest_versions = cache.LRUCache(GAME_CACHE_SIZE, ACTIVE_GAME_MAX_AGE_SECONDS)
+
+# Search time bounds for GET /games/{gameId}/hint, in milliseconds
+DEFAULT_HINT_BUDGET_MS = 500
+MIN_HINT_BUDGET_MS = 10
+MAX_HINT_BUDGET_MS = 5000
+
+# Plies between the board snapshots in the move log; a replay applies at most
+# this many moves to the nearest snapshot
+MOVE_SNAPSHOT_INTERVAL = int(os.environ.get('MOVE_SNAPSHOT_INTERVAL', '16'))
+
+# With the stack's game table stream, finished games are recorded by the
+# stats Lambda (see stats.py) instead of by the request that finished them
+STATS_FROM_STREAM = os.environ.get('STATS_FROM_STREAM', '').lower() in ('1', 'true', 'yes')
+
+# Every ranked player shares this value of the leaderboard index partition key
+LEADERBOARD = 'wins'
+DEFAULT_LEADERBOARD_SIZE = 10
+
+# Version of the packed board encoding written to GameTable
+BOARD_FORMAT = 1
+
+# Stored attributes that never appear in a response
+PRIVATE_ATTRIBUTES = ('packedBoard', 'boardFormat', 'statsRecorded')
+# Attributes stored to build the ``board`` of a response
+BOARD_ATTRIBUTES = ('packedBoard', 'boardFormat', 'board')
+
+# Finished games never change again, so caches may keep them for a year
+FINISHED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Active games are reused for a moment, then revalidated with their ETag;
+# players see moves through the WebSocket push, not by polling
+ACTIVE_CACHE_CONTROL = f'public, max-age={ACTIVE_GAME_MAX_AGE_SECONDS}, stale-while-revalidate={ACTIVE_GAME_MAX_AGE_SECONDS * 5}'
+
+# Attempts made to apply a move when another request updated the game first
+MAX_MOVE_ATTEMPTS = 3
+
+# Attributes a move may change; everything else in the item is left alone
+MOVE_ATTRIBUTES = ('packedBoard', 'boardFormat', 'summary', 'currentPlayer', 'status', 'winner', 'mustJumpFrom', 'updatedAt', 'plies')
+
+# Game state kept in move log snapshots
+SNAPSHOT_ATTRIBUTES = ('packedBoard', 'boardFormat', 'currentPlayer', 'status', 'winner', 'mustJumpFrom')
+
+# Recompute the counts of every move from scratch and compare (debugging only)
+DEBUG_STATE_CHECK = os.environ.get('DEBUG_STATE_CHECK', '').lower() in ('1', 'true', 'yes')
+
+def json_default(obj):
+    """Serialize the Decimal numbers DynamoDB hands back"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def read_position(game):
+    """Return the bitboard Position of a game item, packed or (older items) 8x8"""
+    if 'packedBoard' in game:
+        board_format = int(game.get('boardFormat', BOARD_FORMAT))
+        if board_format != BOARD_FORMAT:
+            raise ValueError(f"Unsupported board format: {board_format}")
+        return rules.from_packed(game['packedBoard'])
+    return rules.from_board(game['board'])
+
+def store_position(game, position, summary=None):
+    """Write a Position and its summary counts into a game item, packed"""
+    game['packedBoard'] = rules.to_packed(position)
+    game['boardFormat'] = BOARD_FORMAT
+    game['summary'] = summary if summary is not None else rules.summarize(position)
+    game.pop('board', None)
+
+def read_summary(game, position):
+    """Return the counts stored with a game, computing them for older items"""
+    return game.get('summary') or rules.summarize(position)
+
+def game_view(game):
+    """Build the HTTP representation of a game item with the expanded board"""
+    view = {key: value for key, value in game.items() if key not in PRIVATE_ATTRIBUTES}
+    view['board'] = rules.to_board(read_position(game))
+    return view
+
+def cache_game(game):
+    """Remember a game item under its version, whose content never changes"""
+    game_cache.put((game['gameId'], int(game.get('version', 0))), copy.deepcopy(game))
+    latest_versions.put(game['gameId'], int(game.get('version', 0)))
+    if game.get('status') == 'finished':
+        game_cache.put((game['gameId'], FINAL_VERSION), copy.deepcopy(game))
+
+def cached_game(game_id, version):
+    """Return a private copy of a cached game version, or ``None``"""
+    game = game_cache.get((game_id, version))
+    return copy.deepcopy(game) if game is not None else None
+
+def recent_game(game_id):
+    """Return the version read or written here moments ago, or ``None``"""
+    version = latest_versions.get(game_id)
+    return cached_game(game_id, version) if version is not None else None
+
+def load_game(game_id):
+    """Read a game, serving finished games from the cache"""
+    game = cached_game(game_id, FINAL_VERSION)
+    if game is None:
+        game = game_table.get({'gameId': game_id})
+        if game is not None:
+            cache_game(game)
+    return game
 
 def create_initial_board():
     """Create the initial checkers board state"""
@@ -26,39 +173,33 @@ def create_initial_board():
 def create_game(event):
     """Create a new game"""
     game_id = str(uuid.uuid4())
-    
-    # Initialize the board
-    board = [
-        ['b', '', 'b', '', 'b', '', 'b', ''],  # 0
-        ['', 'b', '', 'b', '', 'b', '', 'b'],  # 1
-        ['b', '', 'b', '', 'b', '', 'b', ''],  # 2
-        ['', '', '', '', '', '', '', ''],      # 3
-        ['', '', '', '', '', '', '', ''],      # 4
-        ['', 'r', '', 'r', '', 'r', '', 'r'],  # 5
-        ['r', '', 'r', '', 'r', '', 'r', ''],  # 6
-        ['', 'r', '', 'r', '', 'r', '', 'r']   # 7
-    ]
+    body = json.loads(event.get('body') or '{}')
     
     # Create game state
     game = {
         'gameId': game_id,
-        'board': board,
         'currentPlayer': 'red',
         'status': 'active',
         'createdAt': datetime.utcnow().isoformat(),
         'updatedAt': datetime.utcnow().isoformat(),
+        'version': 1,
         'players': {
             'red': event['requestContext']['identity'].get('cognitoIdentityId', 'anonymous'),
-            'black': None
+            'black': BOT_PLAYER if body.get('opponent') == BOT_PLAYER else None
         }
     }
     
-    print(f"Creating new game: {game_id}")
-    print("Initial board:")
-    for row in board:
-        print(" ".join(piece if piece else "_" for piece in row))
+    store_position(game, rules.INITIAL)
+    
+    game['plies'] = 0
+    log.annotate(gameId=game_id)
+    log.debug('Creating new game', players=game['players'])
     
-    game_table.put_item(Item=game)
+    with log.phase('write'):
+        # The log starts with a snapshot of the initial position at ply 0
+        move_log_table.put(move_entry(game, 0), if_absent=True)
+        game_table.put(game, if_absent=True)
+    cache_game(game)
     
     return {
         'statusCode': 201,
@@ -68,15 +209,36 @@ def create_game(event):
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
             'Content-Type': 'application/json'
         },
-        'body': json.dumps(game)
+        'body': json.dumps(with_legal_moves(event, game_view(game)))
     }
 
+def game_etag(event, game):
+    """Entity tag of a game response: the version, plus whether moves are listed"""
+    suffix = '-moves' if wants_legal_moves(event) else ''
+    return f'"{game.get("gameId")}-v{int(game.get("version", 0))}{suffix}"'
+
+def cache_headers(game, etag):
+    """Validator and caching headers for a game response"""
+    return {
+        'ETag': etag,
+        'Cache-Control': FINISHED_CACHE_CONTROL if game.get('status') == 'finished' else ACTIVE_CACHE_CONTROL
+    }
+
+def is_not_modified(event, etag):
+    """Check the request's If-None-Match against an entity tag"""
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+    candidates = [tag.strip() for tag in (headers.get('if-none-match') or '').split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
 def get_game(event):
-    """Get game state"""
+    """Get game state, or a 304 when If-None-Match names the current version"""
     game_id = event['pathParameters']['gameId']
+    log.annotate(gameId=game_id)
     
-    response = game_table.get_item(Key={'gameId': game_id})
-    if 'Item' not in response:
+    with log.phase('read'):
+        # Within the max-age a repeat view costs no table read
+        game = recent_game(game_id) or load_game(game_id)
+    if game is None:
         return {
             'statusCode': 404,
             'headers': {
@@ -88,6 +250,87 @@ def get_game(event):
             'body': json.dumps({'error': 'Game not found'})
         }
     
+    # Retries the stats of a game whose finishing request failed to record them
+    record_stats(game)
+    
+    etag = game_etag(event, game)
+    if is_not_modified(event, etag):
+        return {
+            'statusCode': 304,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                **cache_headers(game, etag)
+            },
+            'body': ''
+        }
+    
+    with log.phase('serialize'):
+        body = json.dumps(with_legal_moves(event, game_view(game)), default=json_default)
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json',
+            **cache_headers(game, etag)
+        },
+        'body': body
+    }
+
+def project_view(game, attributes):
+    """HTTP representation of a game limited to ``attributes`` (plus gameId)"""
+    if attributes is None:
+        return game_view(game)
+    view = game_view(game) if 'board' in attributes else game
+    return {key: view[key] for key in ('gameId', *attributes) if key in view and key not in PRIVATE_ATTRIBUTES}
+
+def batch_games(event):
+    """Fetch up to 100 games in one request, optionally limited to some attributes"""
+    try:
+        body = json.loads(event.get('body') or '{}')
+        game_ids = body['gameIds']
+        attributes = body.get('attributes')
+        if not isinstance(game_ids, list) or not all(isinstance(i, str) for i in game_ids):
+            raise ValueError('gameIds must be a list of ids')
+        game_ids = list(dict.fromkeys(game_ids))
+        if not 0 < len(game_ids) <= storage.MAX_BATCH_KEYS:
+            raise ValueError('gameIds must list 1 to 100 ids')
+        if attributes is not None and (not isinstance(attributes, list) or not all(isinstance(a, str) for a in attributes)):
+            raise ValueError('attributes must be a list of names')
+    except (ValueError, KeyError, TypeError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': f'Invalid batch request: {str(e)}'})
+        }
+    
+    games = {}
+    for game_id in game_ids:
+        game = cached_game(game_id, FINAL_VERSION)
+        if game is not None:
+            games[game_id] = game
+    
+    wanted = [game_id for game_id in game_ids if game_id not in games]
+    if wanted:
+        stored = None
+        if attributes is not None:
+            stored = {'gameId', 'status', 'version', *attributes} - set(PRIVATE_ATTRIBUTES)
+            if 'board' in attributes:
+                stored.update(BOARD_ATTRIBUTES)
+            stored = sorted(stored)
+        for game in game_table.batch_get([{'gameId': game_id} for game_id in wanted], stored):
+            games[game['gameId']] = game
+            if attributes is None:
+                cache_game(game)
+    
     return {
         'statusCode': 200,
         'headers': {
@@ -96,70 +339,284 @@ def get_game(event):
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
             'Content-Type': 'application/json'
         },
-        'body': json.dumps(response['Item'])
+        'body': json.dumps({
+            'games': [project_view(games[game_id], attributes) for game_id in game_ids if game_id in games],
+            'missing': [game_id for game_id in game_ids if game_id not in games]
+        }, default=json_default)
     }
 
-def has_valid_jumps(board, row, col, player_color):
-    """Check if a piece has any valid jumps available"""
-    piece = board[row][col]
-    if not piece:
-        return False
-        
-    is_king = piece.isupper()
-    directions = []
-    
-    # Determine valid directions based on piece type
-    if player_color == 'red' or is_king:
-        directions.append(-1)  # Up
-    if player_color == 'black' or is_king:
-        directions.append(1)   # Down
-        
-    # Check all possible jump directions
-    for row_dir in directions:
-        for col_dir in [-1, 1]:  # Left and right
-            jumped_row = row + row_dir
-            jumped_col = col + col_dir
-            target_row = row + (row_dir * 2)
-            target_col = col + (col_dir * 2)
-            
-            # Check if jump is within bounds
-            if not (0 <= target_row < 8 and 0 <= target_col < 8):
-                continue
-                
-            # Check if there's an opponent's piece to jump over
-            if not board[jumped_row][jumped_col]:
-                continue
-                
-            jumped_piece = board[jumped_row][jumped_col]
-            if player_color == 'red' and jumped_piece.lower() != 'b':
-                continue
-            if player_color == 'black' and jumped_piece.lower() != 'r':
-                continue
-                
-            # Check if landing square is empty
-            if not board[target_row][target_col]:
-                return True
-                
-    return False
+def encode_cursor(last_key):
+    """Turn a LastEvaluatedKey into an opaque URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(last_key, default=json_default).encode()).decode()
 
-def update_game(event):
-    """Update a game with a move"""
+def decode_cursor(cursor, attributes=('gameId', 'status', 'updatedAt')):
+    """Turn a cursor from ``encode_cursor`` back into an ExclusiveStartKey"""
+    last_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(last_key, dict) or set(last_key) != set(attributes):
+        raise ValueError('Invalid cursor')
+    return last_key
+
+def list_games(event):
+    """List one page of games with a given status, most recently updated first"""
+    params = event.get('queryStringParameters') or {}
+    status = params.get('status', 'active')
     try:
-        game_id = event['pathParameters']['gameId']
-        body = json.loads(event['body'])
-        
-        # Get move coordinates
-        from_row = int(body.get('fromRow'))
-        from_col = int(body.get('fromCol'))
-        to_row = int(body.get('toRow'))
-        to_col = int(body.get('toCol'))
-        
-        print(f"Move request: from ({from_row}, {from_col}) to ({to_row}, {to_col})")
-        
-        # Get current game state
-        response = game_table.get_item(Key={'gameId': game_id})
-        if 'Item' not in response:
-            print("Game not found")
+        limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        start_key = decode_cursor(params['cursor']) if params.get('cursor') else None
+    except (ValueError, TypeError):
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Invalid limit or cursor'})
+        }
+    
+    games, last_key = game_table.query(
+        game_status_index, ('status', status), limit, start_key=start_key, forward=False
+    )
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps({
+            'games': games,
+            'cursor': encode_cursor(last_key) if last_key else None
+        }, default=json_default)
+    }
+
+def wants_legal_moves(event):
+    """Check whether the caller asked for the legal move list (?includeMoves=true)"""
+    params = event.get('queryStringParameters') or {}
+    return str(params.get('includeMoves', '')).lower() in ('1', 'true', 'yes')
+
+def legal_moves_for(game):
+    """List the legal moves of the side to move, in board coordinates"""
+    if game.get('status') == 'finished':
+        return []
+    
+    position = read_position(game)
+    pending = game.get('mustJumpFrom')
+    from_sq = rules.square_index(int(pending['row']), int(pending['col'])) if pending else None
+    
+    moves = []
+    for path in rules.legal_moves(position, game['currentPlayer'], from_sq):
+        captures = [
+            list(rules.square_coords(rules.captured_square(a, b)))
+            for a, b in zip(path, path[1:]) if rules.is_jump(a, b)
+        ]
+        moves.append({
+            'path': [list(rules.square_coords(sq)) for sq in path],
+            'captures': captures
+        })
+    return moves
+
+def with_legal_moves(event, game):
+    """Attach ``legalMoves`` to a game response when the caller asked for it"""
+    if not wants_legal_moves(event):
+        return game
+    return {**game, 'legalMoves': legal_moves_for(game)}
+
+def list_moves(event):
+    """List every legal move, including complete multi-jump paths"""
+    game_id = event['pathParameters']['gameId']
+    
+    game = load_game(game_id)
+    if game is None:
+        return {
+            'statusCode': 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Game not found'})
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps({
+            'gameId': game['gameId'],
+            'currentPlayer': game['currentPlayer'],
+            'status': game['status'],
+            'moves': legal_moves_for(game)
+        }, default=json_default)
+    }
+
+def get_hint(event):
+    """Suggest a move for the side to move, searched within ``budgetMs``"""
+    started = time.perf_counter()
+    game_id = event['pathParameters']['gameId']
+    log.annotate(gameId=game_id)
+    params = event.get('queryStringParameters') or {}
+    try:
+        budget_ms = min(max(int(params.get('budgetMs', DEFAULT_HINT_BUDGET_MS)), MIN_HINT_BUDGET_MS), MAX_HINT_BUDGET_MS)
+    except (ValueError, TypeError):
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Invalid budgetMs'})
+        }
+    
+    with log.phase('read'):
+        game = load_game(game_id)
+    if game is None:
+        return {
+            'statusCode': 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Game not found'})
+        }
+    if game.get('status') == 'finished':
+        return {
+            'statusCode': 409,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Game is finished'})
+        }
+    
+    # Only needed for hints and bot games; see play_bot_move
+    import analysis
+    import engine
+    
+    position = read_position(game)
+    current_player = game['currentPlayer']
+    pending = game.get('mustJumpFrom')
+    # Whatever reading the game took comes out of the caller's budget
+    remaining_ms = max(budget_ms - (time.perf_counter() - started) * 1000, 1)
+    with log.phase('search'):
+        if pending:
+            # Part-way through a capture chain only that piece may move on
+            pending_sq = rules.square_index(int(pending['row']), int(pending['col']))
+            result = engine.search(position, current_player, budget_ms=remaining_ms, from_sq=pending_sq)
+            cached = False
+        else:
+            result, cached = analysis.analyse(position, current_player, remaining_ms)
+    log.annotate(hintDepth=result.depth, hintCached=cached)
+    
+    to_path = lambda move: [list(rules.square_coords(sq)) for sq in move]
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps({
+            'gameId': game['gameId'],
+            'version': game.get('version', 0),
+            'currentPlayer': current_player,
+            'move': to_path(result.move) if result.move else None,
+            'pv': [to_path(move) for move in result.pv],
+            'score': result.score,
+            'depth': result.depth,
+            'nodes': result.nodes,
+            'cached': cached,
+            'budgetMs': budget_ms
+        }, default=json_default)
+    }
+
+def replay_position(game_id, ply):
+    """Rebuild a game item as it was after ``ply`` from the nearest snapshot, or return ``None``"""
+    moves = []
+    start_key = {'gameId': game_id, 'ply': ply + 1}
+    while True:
+        entries, start_key = move_log_table.query(
+            None, ('gameId', game_id), MOVE_SNAPSHOT_INTERVAL + 1, start_key=start_key, forward=False
+        )
+        for entry in entries:
+            if 'packedBoard' in entry:
+                state = {'gameId': game_id, 'status': 'active'}
+                state.update({attribute: entry[attribute] for attribute in SNAPSHOT_ATTRIBUTES if attribute in entry})
+                for move in reversed(moves):
+                    if play_move(state, [(int(row), int(col)) for row, col in move['path']]) is None:
+                        raise ValueError(f"Move log of game {game_id} has an illegal move at ply {move['ply']}")
+                return state
+            moves.append(entry)
+        if not start_key:
+            return None
+
+def get_replay(event):
+    """List a game's moves a page at a time, or rebuild the board after ``ply``"""
+    game_id = event['pathParameters']['gameId']
+    log.annotate(gameId=game_id)
+    params = event.get('queryStringParameters') or {}
+    try:
+        ply = int(params['ply']) if params.get('ply') is not None else None
+        limit = min(max(int(params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        start_key = decode_cursor(params['cursor'], ('gameId', 'ply')) if params.get('cursor') else None
+        if ply is not None and ply < 0:
+            raise ValueError('Negative ply')
+    except (ValueError, TypeError):
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Invalid ply, limit or cursor'})
+        }
+    
+    with log.phase('read'):
+        game = load_game(game_id)
+    if game is None or (ply is not None and ply > int(game.get('plies', 0))):
+        return {
+            'statusCode': 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Game not found' if game is None else 'Ply not played yet'})
+        }
+    
+    if ply is None:
+        with log.phase('read'):
+            entries, last_key = move_log_table.query(None, ('gameId', game_id), limit, start_key=start_key)
+        body = {
+            'gameId': game_id,
+            'plies': game.get('plies', 0),
+            'moves': [
+                {'ply': entry['ply'], 'player': entry['player'], 'path': entry['path']}
+                for entry in entries if 'path' in entry
+            ],
+            'cursor': encode_cursor(last_key) if last_key else None
+        }
+    else:
+        with log.phase('apply'):
+            state = replay_position(game_id, ply)
+        if state is None:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -168,115 +625,361 @@ def update_game(event):
                     'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
                     'Content-Type': 'application/json'
                 },
-                'body': json.dumps({'error': 'Game not found'})
+                'body': json.dumps({'error': 'Game history before this ply was not recorded'})
             }
+        body = {
+            'gameId': game_id,
+            'plies': game.get('plies', 0),
+            'ply': ply,
+            'board': rules.to_board(read_position(state)),
+            'currentPlayer': state['currentPlayer'],
+            'status': state['status'],
+            'winner': state.get('winner'),
+            'mustJumpFrom': state.get('mustJumpFrom')
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps(body, default=json_default)
+    }
+
+def has_valid_jumps(board, row, col, player_color):
+    """Check if a piece has any valid jumps available"""
+    s = rules.square_index(row, col)
+    if s < 0 or not board[row][col]:
+        return False
+    return rules.has_jump_from(rules.from_board(board), s, player_color)
+
+def is_square(square):
+    """Check that a submitted square is a [row, col] pair on the board"""
+    return (isinstance(square, (list, tuple)) and len(square) == 2
+            and all(type(value) is int and 0 <= value < 8 for value in square))
+
+def parse_move_path(body):
+    """Read the submitted path or from/to squares; raise ``ValueError`` when malformed"""
+    if not isinstance(body, dict):
+        raise ValueError('body must be a JSON object')
+    if 'path' in body:
+        path = body['path']
+        if not isinstance(path, list) or len(path) < 2:
+            raise ValueError('path must list at least two squares')
+    else:
+        path = [[body.get('fromRow'), body.get('fromCol')], [body.get('toRow'), body.get('toCol')]]
+    if not all(is_square(square) for square in path):
+        raise ValueError('squares must be [row, col] pairs of integers from 0 to 7')
+    return [tuple(square) for square in path]
+
+def piece_at(board, row, col):
+    """Return the piece on a square, or '' when the square is off the board"""
+    if 0 <= row < 8 and 0 <= col < 8:
+        return board[row][col]
+    return ''
+
+def play_move(game, path):
+    """Apply a move path in place; return ``None`` if illegal, else whether the chain goes on"""
+    position = read_position(game)
+    current_player = game['currentPlayer']
+    to_row, to_col = path[-1]
+    
+    if log.enabled(log.DEBUG):
+        log.debug('Current game state', player=current_player, board=rules.to_board(position))
+    
+    # The path has to be a legal move, or the start of a legal capture chain
+    # that the client will finish with further hops
+    with log.phase('validate'):
+        squares = tuple(rules.square_index(row, col) for row, col in path)
+        legal = []
+        if game.get('status') != 'finished':
+            pending = game.get('mustJumpFrom')
+            pending_sq = rules.square_index(int(pending['row']), int(pending['col'])) if pending else None
+            legal = rules.legal_moves(position, current_player, pending_sq)
+        if len(squares) < 2 or not any(move[:len(squares)] == squares for move in legal):
+            return None
+    
+    with log.phase('apply'):
+        # Make the move hop by hop, removing captured pieces and crowning on the far row
+        before = position
+        captures = []
+        for hop_from, hop_to in zip(squares, squares[1:]):
+            position, captured_sq, was_promoted = rules.apply_step(position, hop_from, hop_to, current_player)
+            if captured_sq >= 0:
+                captures.append(rules.square_coords(captured_sq))
         
-        game = response['Item']
-        board = game['board']
-        current_player = game['currentPlayer']
+        # A path that stops part-way through a capture chain keeps the turn
+        has_more_jumps = squares not in legal
+        log.debug('Moved piece', path=path, captured=captures, promoted=was_promoted, moreJumps=has_more_jumps)
         
-        print(f"Current game state:")
-        print(f"Player: {current_player}")
-        print("Board:")
-        for row in board:
-            print(" ".join(piece if piece else "_" for piece in row))
+        # Only the pieces around the squares the move touched are counted again
+        summary = rules.update_summary(read_summary(game, before), before, position)
+        if DEBUG_STATE_CHECK:
+            full = rules.summarize(position)
+            if full != summary:
+                raise AssertionError(f"Incremental counts {summary} differ from a full recount {full}")
         
-        # Validate move
-        if not is_valid_move(board, (from_row, from_col), (to_row, to_col), current_player):
-            print(f"Invalid move detected:")
-            print(f"From: ({from_row}, {from_col}) - Piece: {board[from_row][from_col]}")
-            print(f"To: ({to_row}, {to_col}) - Piece: {board[to_row][to_col]}")
-            print(f"Current player: {current_player}")
+        # Check for winner from the point of view of the side that just moved
+        winner = None if has_more_jumps else rules.summary_winner(summary, current_player)
+    if winner:
+        log.info('Game over', winner=winner)
+        game['status'] = 'finished'
+        game['winner'] = winner
+    
+    # Only switch players if no more jumps are available; otherwise the
+    # same piece has to continue the chain
+    if has_more_jumps:
+        game['mustJumpFrom'] = {'row': to_row, 'col': to_col}
+    else:
+        game.pop('mustJumpFrom', None)
+        current_player = rules.opponent(current_player)
+    
+    # Update game state
+    store_position(game, position, summary)
+    game['currentPlayer'] = current_player
+    game['updatedAt'] = datetime.utcnow().isoformat()
+    
+    if log.enabled(log.DEBUG):
+        log.debug('Updated game state', player=current_player, board=rules.to_board(position))
+    
+    return has_more_jumps
+
+def play_bot_move(game):
+    """Let the computer opponent reply on its turn and return its path, or ``None``"""
+    current_player = game['currentPlayer']
+    if game.get('status') == 'finished' or (game.get('players') or {}).get(current_player) != BOT_PLAYER:
+        return None
+    
+    # The engine and the opening book are only needed for bot games, so keep
+    # them off the cold-start path of every other request
+    import analysis
+    import openings
+    
+    position = read_position(game)
+    book = openings.default_book()
+    move = book.choose(position, current_player) if book else None
+    if move:
+        log.debug('Bot played a book move')
+    else:
+        result, cached = analysis.analyse(position, current_player, BOT_TIME_BUDGET_MS)
+        log.annotate(botNodes=result.nodes, botDepth=result.depth, botCached=cached)
+        log.debug('Bot searched', nodes=result.nodes, depth=result.depth, score=result.score, cached=cached)
+        move = result.move
+    path = [rules.square_coords(sq) for sq in move]
+    play_move(game, path)
+    return path
+
+def move_entry(game, ply, player=None, path=None, snapshot=False):
+    """Build the move log item for ``ply``, with a snapshot every ``MOVE_SNAPSHOT_INTERVAL`` plies"""
+    entry = {'gameId': game['gameId'], 'ply': ply, 'createdAt': game['updatedAt']}
+    if path is not None:
+        entry['player'] = player
+        entry['path'] = [[int(row), int(col)] for row, col in path]
+    if snapshot or ply % MOVE_SNAPSHOT_INTERVAL == 0:
+        entry.update({attribute: game[attribute] for attribute in SNAPSHOT_ATTRIBUTES if attribute in game})
+    return entry
+
+def save_move(game, previous_version, entries=()):
+    """Write a move's attributes and log entries, guarded by the version read"""
+    update = {
+        'set': {
+            'version': game['version'],
+            **{attribute: game[attribute] for attribute in MOVE_ATTRIBUTES if attribute in game}
+        },
+        'remove': ['board'] + [attribute for attribute in MOVE_ATTRIBUTES if attribute not in game],
+        # ConditionFailed when another request wrote first; ``None`` matches
+        # items from before versioning
+        'expected': {'version': previous_version}
+    }
+    if not entries:
+        game_table.update({'gameId': game['gameId']}, **update)
+        return
+    storage.transact([(game_table, {'gameId': game['gameId']}, update)] + [
+        (move_log_table, {'gameId': entry['gameId'], 'ply': entry['ply']}, {
+            'set': {name: value for name, value in entry.items() if name not in ('gameId', 'ply')},
+            'expected': {'ply': None}
+        })
+        for entry in entries
+    ])
+
+def update_game(event):
+    """Update a game with a move"""
+    try:
+        game_id = event['pathParameters']['gameId']
+        log.annotate(gameId=game_id)
+        with log.phase('parse'):
+            try:
+                body = json.loads(event['body'] or '{}')
+                path = parse_move_path(body)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({'error': f'Invalid move request: {str(e)}'})
+                }
+            (from_row, from_col), (to_row, to_col) = path[0], path[-1]
+            expected_version = body.get('version')
+        
+        log.debug('Move request', path=path)
+        
+        # Re-read and re-validate the move when another request wins the write
+        lost_race = False
+        for attempt in range(MAX_MOVE_ATTEMPTS):
+            # A client that names the version it saw can be checked against the
+            # cached copy of exactly that version; otherwise read the table
+            with log.phase('read'):
+                game = None
+                if attempt == 0 and expected_version is not None:
+                    game = cached_game(game_id, int(expected_version))
+                from_cache = game is not None
+                if game is None:
+                    game = game_table.get({'gameId': game_id})
+                    if game is not None:
+                        cache_game(game)
+            if game is None:
+                log.info('Game not found')
+                return {
+                    'statusCode': 404,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({'error': 'Game not found'})
+                }
+            
+            previous_version = int(game['version']) if 'version' in game else None
+            
+            # A client that states the version it saw gets a conflict instead
+            # of having its move replayed on a newer position
+            conflict = expected_version is not None and int(expected_version) != (previous_version or 0)
+            if not conflict:
+                board = rules.to_board(read_position(game))
+                current_player = game['currentPlayer']
+                has_more_jumps = play_move(game, path)
+                # A move that only became invalid because another request got
+                # in first is a conflict, not a bad request
+                conflict = has_more_jumps is None and lost_race
+            
+            if conflict:
+                return {
+                    'statusCode': 409,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({
+                        'error': 'Game was updated by another request',
+                        'version': previous_version or 0
+                    })
+                }
+            
+            if has_more_jumps is None and from_cache:
+                # The game may have moved on; answer from the stored item
+                continue
+            
+            if has_more_jumps is None:
+                log.info('Invalid move', path=path, currentPlayer=current_player)
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({
+                        'error': 'Invalid move',
+                        'details': {
+                            'from': {'row': from_row, 'col': from_col, 'piece': piece_at(board, from_row, from_col)},
+                            'to': {'row': to_row, 'col': to_col, 'piece': piece_at(board, to_row, to_col)},
+                            'path': [[row, col] for row, col in path],
+                            'currentPlayer': current_player
+                        }
+                    })
+                }
+            
+            # Games from before the move log start theirs with a snapshot
+            plies = int(game.get('plies', 0))
+            entries = [move_entry(game, plies + 1, current_player, path, snapshot='plies' not in game)]
+            with log.phase('bot'):
+                bot_player = game['currentPlayer']
+                bot_move = None if has_more_jumps else play_bot_move(game)
+            if bot_move:
+                entries.append(move_entry(game, plies + 2, bot_player, bot_move))
+            game['plies'] = plies + len(entries)
+            
+            game['version'] = (previous_version or 0) + 1
+            try:
+                with log.phase('write'):
+                    save_move(game, previous_version, entries)
+            except storage.ConditionFailed:
+                log.info('Write conflict', attempt=attempt + 1)
+                lost_race = True
+                continue
+            cache_game(game)
+            log.annotate(attempts=attempt + 1, fromCache=from_cache)
+            
+            record_stats(game)
+            
+            with log.phase('serialize'):
+                view = game_view(game)
+                move_result = {
+                    'hasMoreJumps': has_more_jumps,
+                    'botMove': [list(square) for square in bot_move] if bot_move else None
+                }
+                body = json.dumps({
+                    **with_legal_moves(event, view),
+                    **move_result
+                }, default=json_default)
+            
+            # Players and spectators connected over WebSocket get the new state
+            # pushed, legal moves included, instead of polling for it
+            if push.broker():
+                with log.phase('push'):
+                    push.publish(game_id, json.dumps({
+                        'type': 'gameUpdated',
+                        **view,
+                        'legalMoves': legal_moves_for(game),
+                        **move_result
+                    }, default=json_default))
+            
             return {
-                'statusCode': 400,
+                'statusCode': 200,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
                     'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                     'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
                     'Content-Type': 'application/json'
                 },
-                'body': json.dumps({
-                    'error': 'Invalid move',
-                    'details': {
-                        'from': {'row': from_row, 'col': from_col, 'piece': board[from_row][from_col]},
-                        'to': {'row': to_row, 'col': to_col, 'piece': board[to_row][to_col]},
-                        'currentPlayer': current_player
-                    }
-                })
+                'body': body
             }
         
-        # Make the move
-        piece = board[from_row][from_col]
-        board[from_row][from_col] = ''
-        board[to_row][to_col] = piece
-        
-        print(f"Moving piece {piece} from ({from_row}, {from_col}) to ({to_row}, {to_col})")
-        
-        # Handle jump captures
-        captured = False
-        if abs(to_row - from_row) == 2:
-            jumped_row = (from_row + to_row) // 2
-            jumped_col = (from_col + to_col) // 2
-            captured_piece = board[jumped_row][jumped_col]
-            board[jumped_row][jumped_col] = ''
-            captured = True
-            print(f"Captured piece {captured_piece} at ({jumped_row}, {jumped_col})")
-        
-        # Handle king promotion
-        was_promoted = False
-        if (current_player == 'red' and to_row == 0) or (current_player == 'black' and to_row == 7):
-            board[to_row][to_col] = board[to_row][to_col].upper()
-            was_promoted = True
-            print(f"Piece promoted to king at ({to_row}, {to_col})")
-        
-        # Check for additional jumps
-        has_more_jumps = False
-        if captured and not was_promoted:
-            has_more_jumps = has_valid_jumps(board, to_row, to_col, current_player)
-            print(f"Additional jumps available: {has_more_jumps}")
-        
-        # Only switch players if no more jumps are available
-        if not has_more_jumps:
-            current_player = 'black' if current_player == 'red' else 'red'
-        
-        # Check for winner
-        winner = check_winner(board, current_player)
-        if winner:
-            print(f"Game over! {winner} wins!")
-            game['status'] = 'finished'
-            game['winner'] = winner
-        
-        # Update game state
-        game['board'] = board
-        game['currentPlayer'] = current_player
-        game['updatedAt'] = datetime.utcnow().isoformat()
-        
-        print("\nUpdated game state:")
-        print(f"Next player: {current_player}")
-        print("Board:")
-        for row in board:
-            print(" ".join(piece if piece else "_" for piece in row))
-        
-        game_table.put_item(Item=game)
-        
         return {
-            'statusCode': 200,
+            'statusCode': 409,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({
-                **game,
-                'hasMoreJumps': has_more_jumps
-            })
+            'body': json.dumps({'error': 'Game was updated by another request'})
         }
         
     except Exception as e:
-        print(f"Error processing move: {str(e)}")
         import traceback
-        traceback.print_exc()
+        log.error('Error processing move', error=str(e), traceback=traceback.format_exc())
         return {
             'statusCode': 400,
             'headers': {
@@ -296,185 +999,68 @@ def update_game(event):
 
 def is_valid_move(board, from_pos, to_pos, player_color):
     """Validate a move according to checkers rules"""
-    from_row, from_col = from_pos
-    to_row, to_col = to_pos
-    
-    print(f"Validating move: {from_pos} -> {to_pos} for {player_color}")
-    
-    # Basic boundary checks
-    if not (0 <= from_row < 8 and 0 <= from_col < 8 and 0 <= to_row < 8 and 0 <= to_col < 8):
-        print("Invalid: Out of bounds")
-        return False
-    
-    # Check if there's a piece at the start position
-    piece = board[from_row][from_col]
-    if not piece:
-        print("Invalid: No piece at start position")
-        return False
-    
-    # Check if it's the right color piece
-    if player_color == 'red' and piece.lower() != 'r':
-        print("Invalid: Not a red piece")
-        return False
-    if player_color == 'black' and piece.lower() != 'b':
-        print("Invalid: Not a black piece")
-        return False
-    
-    # Check if destination is empty
-    if board[to_row][to_col]:
-        print("Invalid: Destination is not empty")
-        return False
-    
-    # Get move details
-    is_king = piece.isupper()
-    row_diff = to_row - from_row
-    col_diff = abs(to_col - from_col)
-    
-    print(f"Move details: row_diff={row_diff}, col_diff={col_diff}, is_king={is_king}")
-    
-    # Regular move - one square diagonally forward
-    if col_diff == 1:
-        if player_color == 'red' and row_diff == -1:
-            print("Valid: Regular red move forward")
-            return True
-        if player_color == 'black' and row_diff == 1:
-            print("Valid: Regular black move forward")
-            return True
-        if is_king and abs(row_diff) == 1:
-            print("Valid: King move")
-            return True
-        print("Invalid: Invalid regular move direction")
-        return False
-    
-    # Jump move - two squares diagonally
-    if col_diff == 2 and abs(row_diff) == 2:
-        jumped_row = (from_row + to_row) // 2
-        jumped_col = (from_col + to_col) // 2
-        jumped_piece = board[jumped_row][jumped_col]
-        
-        print(f"Jump move: jumped_piece={jumped_piece}")
-        
-        # Must be jumping over an opponent's piece
-        if not jumped_piece:
-            print("Invalid: No piece to jump over")
-            return False
-        
-        if player_color == 'red' and jumped_piece.lower() != 'b':
-            print("Invalid: Red must jump over black")
-            return False
-        
-        if player_color == 'black' and jumped_piece.lower() != 'r':
-            print("Invalid: Black must jump over red")
-            return False
-        
-        # Regular pieces can only jump forward
-        if not is_king:
-            if player_color == 'red' and row_diff != -2:
-                print("Invalid: Red must jump forward")
-                return False
-            if player_color == 'black' and row_diff != 2:
-                print("Invalid: Black must jump forward")
-                return False
-        
-        print("Valid: Jump move")
-        return True
-    
-    print("Invalid: Not a valid move pattern")
-    return False
+    return rules.is_valid_step(
+        rules.from_board(board),
+        rules.square_index(*from_pos),
+        rules.square_index(*to_pos),
+        player_color
+    )
 
 def has_any_moves(board, player_color):
     """Check if a player has any valid moves available"""
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if not piece:
-                continue
-                
-            # Check if this is the player's piece
-            if (player_color == 'red' and piece.lower() != 'r') or \
-               (player_color == 'black' and piece.lower() != 'b'):
-                continue
-            
-            # Check for any jumps
-            if has_valid_jumps(board, row, col, player_color):
-                return True
-                
-            # Check for regular moves
-            is_king = piece.isupper()
-            directions = []
-            
-            # Determine valid directions based on piece type
-            if player_color == 'red' or is_king:
-                directions.append(-1)  # Up
-            if player_color == 'black' or is_king:
-                directions.append(1)   # Down
-                
-            # Check all possible move directions
-            for row_dir in directions:
-                for col_dir in [-1, 1]:  # Left and right
-                    target_row = row + row_dir
-                    target_col = col + col_dir
-                    
-                    # Check if move is within bounds
-                    if not (0 <= target_row < 8 and 0 <= target_col < 8):
-                        continue
-                        
-                    # Check if target square is empty
-                    if not board[target_row][target_col]:
-                        return True
-                        
-    return False
+    return rules.has_any_moves(rules.from_board(board), player_color)
 
 def count_pieces(board, player_color):
     """Count how many pieces a player has"""
-    count = 0
-    for row in board:
-        for piece in row:
-            if not piece:
-                continue
-            if (player_color == 'red' and piece.lower() == 'r') or \
-               (player_color == 'black' and piece.lower() == 'b'):
-                count += 1
-    return count
+    return rules.count_pieces(rules.from_board(board), player_color)
 
 def check_winner(board, current_player):
     """Check if there's a winner"""
-    opponent = 'black' if current_player == 'red' else 'red'
-    
-    # Check if opponent has any pieces left
-    opponent_pieces = count_pieces(board, opponent)
-    if opponent_pieces == 0:
-        return current_player
-        
-    # Check if opponent has any valid moves
-    if not has_any_moves(board, opponent):
-        return current_player
-        
-    return None
+    return rules.check_winner(rules.from_board(board), current_player)
 
-def update_stats(player_id, is_winner):
-    """Update player statistics"""
-    if player_id == 'anonymous':
+def update_stats(game):
+    """Record a finished game in the players' statistics exactly once"""
+    players = [
+        (player_id, color == game.get('winner'))
+        for color, player_id in (game.get('players') or {}).items()
+        if player_id and player_id not in ('anonymous', BOT_PLAYER)
+    ]
+    if not players:
         return
     
+    # The marker goes in the same transaction, so a repeated call changes nothing
+    updates = [(game_table, {'gameId': game['gameId']}, {
+        'set': {'statsRecorded': True},
+        'expected': {'statsRecorded': None}
+    })]
+    for player_id, is_winner in players:
+        updates.append((stats_table, {'playerId': player_id}, {
+            'set': {'leaderboard': LEADERBOARD},
+            'add': {'wins': int(is_winner), 'losses': int(not is_winner), 'totalGames': 1}
+        }))
+    
     try:
-        response = stats_table.get_item(Key={'playerId': player_id})
-        stats = response.get('Item', {
-            'playerId': player_id,
-            'wins': 0,
-            'losses': 0,
-            'totalGames': 0
-        })
-        
-        stats['totalGames'] += 1
-        if is_winner:
-            stats['wins'] += 1
-        else:
-            stats['losses'] += 1
-        
-        stats_table.put_item(Item=stats)
+        storage.transact(updates)
+    except storage.ConditionFailed:
+        log.info('Stats already recorded', gameId=game['gameId'])
+
+def needs_stats(game):
+    """Whether a game is finished but not yet in the players' statistics"""
+    return game.get('status') == 'finished' and not game.get('statsRecorded')
+
+def record_stats(game):
+    """Record a finished game's stats inline when no stream does; retried on the next read"""
+    if STATS_FROM_STREAM or not needs_stats(game):
+        return
+    try:
+        with log.phase('write'):
+            update_stats(game)
     except Exception as e:
-        print(f"Error updating stats for player {player_id}: {str(e)}")
+        # A stats failure must not fail the request that noticed it
+        log.error('Error updating stats', gameId=game['gameId'], error=str(e))
+        return
+    game['statsRecorded'] = True
+    cache_game(game)
 
 def get_stats(event):
     """Get player statistics"""
@@ -491,14 +1077,43 @@ def get_stats(event):
             'body': json.dumps({'error': 'Player not authenticated'})
         }
     
-    response = stats_table.get_item(Key={'playerId': player_id})
-    stats = response.get('Item', {
+    stats = stats_table.get({'playerId': player_id}) or {
         'playerId': player_id,
         'wins': 0,
         'losses': 0,
         'totalGames': 0
-    })
+    }
+    stats.pop('leaderboard', None)
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+            'Content-Type': 'application/json'
+        },
+        'body': json.dumps(stats, default=json_default)
+    }
+
+def get_leaderboard(event):
+    """List the players with the most wins, read from the leaderboard index"""
+    params = event.get('queryStringParameters') or {}
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LEADERBOARD_SIZE)), 1), MAX_PAGE_SIZE)
+    except (ValueError, TypeError):
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': 'Invalid limit'})
+        }
     
+    players, _ = stats_table.query(leaderboard_index, ('leaderboard', LEADERBOARD), limit, forward=False)
     return {
         'statusCode': 200,
         'headers': {
@@ -507,13 +1122,25 @@ def get_stats(event):
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
             'Content-Type': 'application/json'
         },
-        'body': json.dumps(stats)
+        'body': json.dumps({
+            'players': [
+                {
+                    'rank': rank,
+                    'playerId': player['playerId'],
+                    'wins': player.get('wins', 0),
+                    'losses': player.get('losses', 0),
+                    'totalGames': player.get('totalGames', 0)
+                }
+                for rank, player in enumerate(players, 1)
+            ]
+        }, default=json_default)
     }
 
-def handler(event, context):
-    """Main Lambda handler"""
+def handle(event, context):
+    """Route an API Gateway request"""
     http_method = event['httpMethod']
     resource = event['resource']
+    log.start(f"{http_method} {resource}", requestId=getattr(context, 'aws_request_id', None))
     
     try:
         if resource == '/games':
@@ -521,14 +1148,29 @@ def handler(event, context):
                 response = create_game(event)
             elif http_method == 'GET':
                 response = list_games(event)
+        elif resource == '/games/batch':
+            if http_method == 'POST':
+                response = batch_games(event)
         elif resource == '/games/{gameId}':
             if http_method == 'GET':
                 response = get_game(event)
             elif http_method == 'PUT':
                 response = update_game(event)
+        elif resource == '/games/{gameId}/moves':
+            if http_method == 'GET':
+                response = list_moves(event)
+        elif resource == '/games/{gameId}/replay':
+            if http_method == 'GET':
+                response = get_replay(event)
+        elif resource == '/games/{gameId}/hint':
+            if http_method == 'GET':
+                response = get_hint(event)
         elif resource == '/stats':
             if http_method == 'GET':
                 response = get_stats(event)
+        elif resource == '/leaderboard':
+            if http_method == 'GET':
+                response = get_leaderboard(event)
         else:
             response = {
                 'statusCode': 400,
@@ -541,9 +1183,12 @@ def handler(event, context):
                 'body': json.dumps({'error': 'Invalid endpoint'})
             }
         
+        log.finish(response['statusCode'], gameCache=game_cache.stats())
         return response
     
     except Exception as e:
+        log.error('Unhandled error', error=str(e))
+        log.finish(500)
         return {
             'statusCode': 500,
             'headers': {
@@ -554,3 +1199,6 @@ def handler(event, context):
             },
             'body': json.dumps({'error': str(e)})
         }
+
+# The Lambda entry point; only profiled when PROFILE_SAMPLE_RATE or PROFILE_SECRET is set
+handler = profiling.profiled(handle)
@@ -0,0 +1,196 @@
+"""Opening book: a sorted fixed-width binary file looked up by Zobrist hash.
+
+Each record is ``(hash, move, weight)`` packed as ``<QHH``.  ``hash`` is
+``engine.zobrist_hash`` of the position and side to move, ``move`` is the
+index of the reply in ``rules.legal_moves`` (which is deterministic), and
+``weight`` is its relative frequency.  Records are sorted by hash, so the
+replies of a position are contiguous and found with a binary search over the
+memory-mapped file.
+
+Build a book by searching the first plies with the engine::
+
+    python lambda/openings.py generate --plies 8 --output lambda/data/openings.book
+
+or from recorded games, one game per line with moves like ``5,1-4,0`` and
+capture chains like ``5,1-3,3-1,5``::
+
+    python lambda/openings.py import games.txt --plies 12
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import defaultdict
+
+import engine
+import rules
+
+RECORD = struct.Struct('<QHH')
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'openings.book')
+
+
+class OpeningBook:
+    """Read-only, memory-mapped view of a book file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        self._count = len(self._map) // RECORD.size
+
+    def __len__(self):
+        return self._count
+
+    def _hash_at(self, i):
+        return RECORD.unpack_from(self._map, i * RECORD.size)[0]
+
+    def replies(self, pos, color):
+        """Return ``[(move, weight), ...]`` for a position, or an empty list"""
+        key = engine.zobrist_hash(pos, color)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._hash_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        moves = None
+        while lo < self._count:
+            h, move_index, weight = RECORD.unpack_from(self._map, lo * RECORD.size)
+            if h != key:
+                break
+            if moves is None:
+                moves = rules.legal_moves(pos, color)
+            if move_index < len(moves):
+                found.append((moves[move_index], weight))
+            lo += 1
+        return found
+
+    def choose(self, pos, color, rng=random):
+        """Pick a book reply at random by weight, or ``None`` when out of book"""
+        found = self.replies(pos, color)
+        if not found:
+            return None
+        moves, weights = zip(*found)
+        return rng.choices(moves, weights=weights)[0]
+
+
+_default = None
+
+
+def default_book():
+    """Open the book shipped with the Lambda asset on first use, if present"""
+    global _default
+    if _default is None:
+        path = os.environ.get('OPENING_BOOK_PATH', DEFAULT_PATH)
+        _default = OpeningBook(path) if os.path.exists(path) else False
+    return _default or None
+
+
+def write(output, entries):
+    """Write ``{(hash, move_index): weight}`` as a sorted book file"""
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'wb') as f:
+        for (h, move_index), weight in sorted(entries.items()):
+            f.write(RECORD.pack(h, move_index, min(max(int(weight), 1), MAX_WEIGHT)))
+
+
+def generate(plies, depth, width, margin, log=sys.stderr):
+    """Build book entries by searching every reply of the first ``plies`` plies.
+
+    At each position the replies scoring within ``margin`` of the best (at
+    most ``width`` of them) go into the book, weighted by score, and are
+    expanded further.
+    """
+    entries = {}
+    frontier = [(rules.INITIAL, rules.RED)]
+    seen = set()
+    for ply in range(plies):
+        next_frontier = []
+        for pos, color in frontier:
+            h = engine.zobrist_hash(pos, color)
+            if h in seen:
+                continue
+            seen.add(h)
+            moves = rules.legal_moves(pos, color)
+            if not moves:
+                continue
+            other = rules.opponent(color)
+            scored = []
+            for index, move in enumerate(moves):
+                child = engine.make_move(pos, color, move)
+                result = engine.search(child, other, budget_ms=60000, max_depth=depth, table={})
+                scored.append((-result.score, index, child))
+            scored.sort(reverse=True)
+            best = scored[0][0]
+            for score, index, child in scored[:width]:
+                if score < best - margin:
+                    break
+                entries[(h, index)] = max(1, margin - (best - score))
+                next_frontier.append((child, other))
+        print(f"ply {ply + 1}: {len(entries)} entries", file=log)
+        frontier = next_frontier
+    return entries
+
+
+def parse_game(line):
+    """Parse ``5,1-4,0 2,2-3,3 ...`` into a list of square paths"""
+    moves = []
+    for token in line.split():
+        squares = []
+        for square in token.split('-'):
+            row, col = square.split(',')
+            squares.append(rules.square_index(int(row), int(col)))
+        moves.append(tuple(squares))
+    return moves
+
+
+def import_games(lines, plies, log=sys.stderr):
+    """Count how often each reply was played in the first ``plies`` plies"""
+    entries = defaultdict(int)
+    for number, line in enumerate(lines, 1):
+        if not line.strip() or line.startswith('#'):
+            continue
+        pos, color = rules.INITIAL, rules.RED
+        for move in parse_game(line)[:plies]:
+            legal = rules.legal_moves(pos, color)
+            if move not in legal:
+                print(f"line {number}: illegal move {move}, rest of game skipped", file=log)
+                break
+            entries[(engine.zobrist_hash(pos, color), legal.index(move))] += 1
+            pos, color = engine.make_move(pos, color, move), rules.opponent(color)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the checkers opening book')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='search the opening plies with the engine')
+    gen.add_argument('--plies', type=int, default=8)
+    gen.add_argument('--depth', type=int, default=6, help='search depth for each candidate reply')
+    gen.add_argument('--width', type=int, default=2, help='replies kept per position')
+    gen.add_argument('--margin', type=int, default=30, help='score window around the best reply')
+    gen.add_argument('--output', default=DEFAULT_PATH)
+
+    imp = commands.add_parser('import', help='count replies in recorded games')
+    imp.add_argument('games', help='file with one game per line')
+    imp.add_argument('--plies', type=int, default=12)
+    imp.add_argument('--output', default=DEFAULT_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        entries = generate(args.plies, args.depth, args.width, args.margin)
+    else:
+        with open(args.games) as f:
+            entries = import_games(f, args.plies)
+    write(args.output, entries)
+    print(f"wrote {len(entries)} records to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Opt-in cProfile runs of production invocations.
+
+An invocation is profiled when either
+
+* a random draw falls under ``PROFILE_SAMPLE_RATE`` (``0.01`` profiles one
+  request in a hundred), or
+* it carries an ``X-Profile-Token`` header signed with ``PROFILE_SECRET``,
+  made by ``token`` and valid until the expiry it names.
+
+The stats go to ``PROFILE_SINK``: ``s3://bucket/prefix/`` in production, or
+a local directory (``/tmp/profiles`` by default) for tests and offline runs.
+Each profile is written as a pstats file for ``snakeviz`` or ``pstats`` and
+a text summary of the most expensive functions::
+
+    python -m pstats profile.prof
+
+With neither setting, ``profiled`` returns the handler unchanged, so a
+normal invocation pays nothing at all.
+"""
+import functools
+import hashlib
+import hmac
+import io
+import marshal
+import os
+import random
+import re
+import time
+
+import log
+
+SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0') or 0)
+SECRET = os.environ.get('PROFILE_SECRET', '')
+SINK = os.environ.get('PROFILE_SINK', '/tmp/profiles')
+
+TOKEN_HEADER = 'x-profile-token'
+# Functions listed in the text summary
+SUMMARY_LINES = 40
+
+_s3 = None
+
+
+def token(expires, secret=None):
+    """Header value that enables profiling until the Unix time ``expires``"""
+    expires = int(expires)
+    signature = hmac.new((secret or SECRET).encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def has_valid_token(event):
+    """Whether the request carries an unexpired, correctly signed token"""
+    if not SECRET:
+        return False
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+    expires, _, _ = (headers.get(TOKEN_HEADER) or '').partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(headers[TOKEN_HEADER], token(expires))
+
+
+def should_profile(event):
+    return (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE) or has_valid_token(event)
+
+
+def profile_name(event, context):
+    """Sortable file name for one invocation: time, route and request id"""
+    route = f"{event.get('httpMethod', '')}{event.get('resource', '')}"
+    route = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'invocation'
+    request_id = getattr(context, 'aws_request_id', None) or f'{random.getrandbits(32):08x}'
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{route}-{request_id}"
+
+
+def write(name, data):
+    """Store one file in the sink and return where it went"""
+    global _s3
+    if SINK.startswith('s3://'):
+        bucket, _, prefix = SINK[len('s3://'):].partition('/')
+        if _s3 is None:
+            import boto3
+            _s3 = boto3.client('s3')
+        key = f"{prefix.rstrip('/')}/{name}" if prefix else name
+        _s3.put_object(Bucket=bucket, Key=key, Body=data)
+        return f's3://{bucket}/{key}'
+    os.makedirs(SINK, exist_ok=True)
+    path = os.path.join(SINK, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def save(profiler, name):
+    """Write the pstats dump and the text summary of a finished profile"""
+    import pstats
+    # The same bytes pstats.Stats.dump_stats writes, without a temporary file
+    location = write(f'{name}.prof', marshal.dumps(pstats.Stats(profiler).stats))
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    write(f'{name}.txt', summary.getvalue().encode())
+    return location
+
+
+def profiled(handler):
+    """Wrap a Lambda handler so that selected invocations run under cProfile"""
+    if SAMPLE_RATE <= 0 and not SECRET:
+        return handler
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not should_profile(event):
+            return handler(event, context)
+        # Loaded only here, so cold starts without profiling never import them
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(handler, event, context)
+        finally:
+            try:
+                log.warning('Profile written', location=save(profiler, profile_name(event, context)))
+            except Exception as e:
+                # Losing a profile must not fail the request it measured
+                log.error('Error writing profile', error=str(e))
+
+    return wrapper
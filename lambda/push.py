@@ -0,0 +1,170 @@
+"""Push game updates to WebSocket clients.
+
+Clients connect to the WebSocket API with ``?gameId=...``; ``handler``
+records the connection (as a player or a spectator) in the connections
+table and drops it on disconnect.  After every move ``update_game`` calls
+``publish``, which sends the new state to every connection of the game, so
+nobody has to poll ``GET /games/{gameId}``.
+
+The broker is API Gateway's management API when ``WEBSOCKET_ENDPOINT`` is
+set, or an in-process ``LocalBroker`` with ``PUSH_BACKEND=local`` for tests
+and offline runs.  Without either, ``publish`` does nothing.
+"""
+import json
+import os
+import threading
+import time
+
+import log
+import storage
+
+# Page size used when reading the connections of one game
+FAN_OUT_PAGE_SIZE = 100
+# API Gateway closes WebSocket connections after two hours at the latest
+CONNECTION_TTL_SECONDS = 2 * 60 * 60
+
+connections_index = os.environ.get('CONNECTIONS_INDEX', 'GameConnectionsIndex')
+connections_table = storage.table(
+    os.environ.get('CONNECTIONS_TABLE', 'ConnectionsTable'),
+    key='connectionId',
+    indexes={connections_index: ('gameId', 'connectionId', ('role',))}
+)
+game_table = storage.table(os.environ.get('GAME_TABLE', 'GameTable'), key='gameId')
+
+
+class ApiGatewayBroker:
+    """Sends messages through the WebSocket API's management endpoint"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self._client = None
+
+    def send(self, connection_id, data):
+        """Send one message; returns False when the connection is gone"""
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('apigatewaymanagementapi', endpoint_url=self.endpoint)
+        try:
+            self._client.post_to_connection(ConnectionId=connection_id, Data=data)
+        except Exception as e:
+            code = (getattr(e, 'response', None) or {}).get('Error', {}).get('Code')
+            if code == 'GoneException':
+                return False
+            raise
+        return True
+
+
+class LocalBroker:
+    """In-process stand-in for API Gateway: keeps every message per connection"""
+
+    def __init__(self):
+        self.messages = {}
+        self._lock = threading.Lock()
+
+    def open(self, connection_id):
+        with self._lock:
+            self.messages[connection_id] = []
+
+    def close(self, connection_id):
+        with self._lock:
+            self.messages.pop(connection_id, None)
+
+    def send(self, connection_id, data):
+        """Keep the decoded message; returns False for a closed connection"""
+        with self._lock:
+            if connection_id not in self.messages:
+                return False
+            self.messages[connection_id].append(json.loads(data))
+        return True
+
+
+_broker = None
+
+
+def broker():
+    """The broker chosen by the environment, or ``None`` when push is off"""
+    global _broker
+    if _broker is None:
+        if os.environ.get('PUSH_BACKEND', '').lower() == 'local':
+            _broker = LocalBroker()
+        elif os.environ.get('WEBSOCKET_ENDPOINT'):
+            _broker = ApiGatewayBroker(os.environ['WEBSOCKET_ENDPOINT'])
+        else:
+            _broker = False
+    return _broker or None
+
+
+def connections(game_id):
+    """Yield the connection items of a game"""
+    start_key = None
+    while True:
+        items, start_key = connections_table.query(
+            connections_index, ('gameId', game_id), FAN_OUT_PAGE_SIZE, start_key=start_key
+        )
+        yield from items
+        if not start_key:
+            return
+
+
+def publish(game_id, data):
+    """Send a JSON message to everyone connected to a game; returns how many got it.
+
+    Connections that turn out to be gone are removed.  Delivery is best
+    effort: a failure is logged and never fails the move that caused it.
+    """
+    target = broker()
+    if target is None:
+        return 0
+    delivered = 0
+    try:
+        for connection in connections(game_id):
+            if target.send(connection['connectionId'], data):
+                delivered += 1
+            else:
+                connections_table.delete({'connectionId': connection['connectionId']})
+    except Exception as e:
+        log.error('Error pushing update', gameId=game_id, error=str(e))
+    return delivered
+
+
+def connect(event):
+    """Register a connection for the game named in the query string"""
+    connection_id = event['requestContext']['connectionId']
+    game_id = (event.get('queryStringParameters') or {}).get('gameId')
+    game = game_table.get({'gameId': game_id}) if game_id else None
+    if game is None:
+        return {'statusCode': 404, 'body': 'Game not found'}
+
+    player_id = event['requestContext'].get('identity', {}).get('cognitoIdentityId')
+    role = 'player' if player_id and player_id in (game.get('players') or {}).values() else 'spectator'
+    connections_table.put({
+        'connectionId': connection_id,
+        'gameId': game_id,
+        'role': role,
+        'expiresAt': int(time.time()) + CONNECTION_TTL_SECONDS
+    })
+    target = broker()
+    if isinstance(target, LocalBroker):
+        target.open(connection_id)
+    log.info('Connection joined game', connectionId=connection_id, gameId=game_id, role=role)
+    return {'statusCode': 200, 'body': 'Connected'}
+
+
+def disconnect(event):
+    """Forget a closed connection"""
+    connection_id = event['requestContext']['connectionId']
+    connections_table.delete({'connectionId': connection_id})
+    target = broker()
+    if isinstance(target, LocalBroker):
+        target.close(connection_id)
+    return {'statusCode': 200, 'body': 'Disconnected'}
+
+
+def handler(event, context):
+    """WebSocket API handler for the $connect and $disconnect routes"""
+    route = event['requestContext'].get('routeKey')
+    if route == '$connect':
+        return connect(event)
+    if route == '$disconnect':
+        return disconnect(event)
+    return {'statusCode': 400, 'body': 'Moves are made with PUT /games/{gameId}'}
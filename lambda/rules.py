@@ -0,0 +1,449 @@
+"""Bitboard checkers rules engine.
+
+A position is three 32-bit integers over the 32 playable (dark) squares:
+``red``, ``black`` and ``kings``.  Square ``s`` maps to board row ``s // 4``
+and column ``2 * (s % 4) + (row % 2)``, so square 0 is the top-left dark
+square of the ``board`` list used by the API.  Black starts at the top and
+moves down (increasing row), red starts at the bottom and moves up.
+
+Neighbouring squares are one shift away, but the shift depends on the row
+parity, so every single-step direction is a pair of masked shifts.  Two steps
+in the same direction (a jump) always add up to a fixed shift of 7 or 9.
+"""
+from collections import namedtuple
+
+FULL = 0xFFFFFFFF
+
+Position = namedtuple('Position', ['red', 'black', 'kings'])
+
+# Row masks: even rows hold columns 0,2,4,6 and odd rows hold 1,3,5,7
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+# Left-most square of even rows and right-most square of odd rows
+LEFT_EDGE = 0x01010101
+RIGHT_EDGE = 0x80808080
+
+# Row masks used for promotion
+TOP_ROW = 0x0000000F
+BOTTOM_ROW = 0xF0000000
+
+UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT = range(4)
+UP = (UP_LEFT, UP_RIGHT)
+DOWN = (DOWN_LEFT, DOWN_RIGHT)
+ALL_DIRECTIONS = UP + DOWN
+OPPOSITE = {UP_LEFT: DOWN_RIGHT, UP_RIGHT: DOWN_LEFT,
+            DOWN_LEFT: UP_RIGHT, DOWN_RIGHT: UP_LEFT}
+
+RED = 'red'
+BLACK = 'black'
+
+
+def opponent(color):
+    """Return the other side"""
+    return BLACK if color == RED else RED
+
+
+def shift(bb, direction):
+    """Move every bit of ``bb`` one diagonal step in ``direction``"""
+    if direction == UP_LEFT:
+        return ((bb & EVEN_ROWS & ~LEFT_EDGE) >> 5) | ((bb & ODD_ROWS) >> 4)
+    if direction == UP_RIGHT:
+        return ((bb & EVEN_ROWS) >> 4) | ((bb & ODD_ROWS & ~RIGHT_EDGE) >> 3)
+    if direction == DOWN_LEFT:
+        return (((bb & EVEN_ROWS & ~LEFT_EDGE) << 3) | ((bb & ODD_ROWS) << 4)) & FULL
+    return (((bb & EVEN_ROWS) << 4) | ((bb & ODD_ROWS & ~RIGHT_EDGE) << 5)) & FULL
+
+
+def _build_tables():
+    neighbours = [[-1] * 32 for _ in range(4)]
+    landings = [[-1] * 32 for _ in range(4)]
+    for direction in ALL_DIRECTIONS:
+        for s in range(32):
+            step = shift(1 << s, direction)
+            if not step:
+                continue
+            neighbours[direction][s] = step.bit_length() - 1
+            jump = shift(step, direction)
+            if jump:
+                landings[direction][s] = jump.bit_length() - 1
+    return neighbours, landings
+
+
+# NEIGHBOUR[d][s] / LANDING[d][s]: square one / two steps away, or -1
+NEIGHBOUR, LANDING = _build_tables()
+
+
+def square_index(row, col):
+    """Return the square index for a board coordinate, or -1 for light squares"""
+    if not (0 <= row < 8 and 0 <= col < 8) or (row + col) % 2:
+        return -1
+    return row * 4 + col // 2
+
+
+def square_coords(s):
+    """Return the (row, col) board coordinate of a square index"""
+    row = s // 4
+    return row, 2 * (s % 4) + (row % 2)
+
+
+def bits(bb):
+    """Yield the indices of the set bits of ``bb``, lowest first"""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def from_board(board):
+    """Convert the 8x8 ``board`` list used by the API into a Position"""
+    red = black = kings = 0
+    for s in range(32):
+        row, col = square_coords(s)
+        piece = board[row][col]
+        if not piece:
+            continue
+        bit = 1 << s
+        if piece in ('r', 'R'):
+            red |= bit
+        elif piece in ('b', 'B'):
+            black |= bit
+        else:
+            continue
+        if piece.isupper():
+            kings |= bit
+    return Position(red, black, kings)
+
+
+def to_board(pos):
+    """Convert a Position back into the 8x8 ``board`` list used by the API"""
+    board = [[''] * 8 for _ in range(8)]
+    for s in bits(pos.red | pos.black):
+        row, col = square_coords(s)
+        piece = 'r' if pos.red >> s & 1 else 'b'
+        board[row][col] = piece.upper() if pos.kings >> s & 1 else piece
+    return board
+
+
+INITIAL = Position(red=0xFFF00000, black=0x00000FFF, kings=0)
+
+
+def own_pieces(pos, color):
+    """Return the bitboard of ``color``'s pieces"""
+    return pos.red if color == RED else pos.black
+
+
+def empty_squares(pos):
+    """Return the bitboard of empty playable squares"""
+    return ~(pos.red | pos.black) & FULL
+
+
+def _forward(color):
+    return UP if color == RED else DOWN
+
+
+def count_pieces(pos, color):
+    """Count how many pieces ``color`` has"""
+    return bin(own_pieces(pos, color)).count('1')
+
+
+def movers(pos, color):
+    """Bitboard of ``color``'s pieces that have a non-capturing step"""
+    own = own_pieces(pos, color)
+    empty = empty_squares(pos)
+    result = 0
+    for direction in ALL_DIRECTIONS:
+        pieces = own if direction in _forward(color) else own & pos.kings
+        if pieces:
+            result |= shift(empty, OPPOSITE[direction]) & pieces
+    return result
+
+
+def jumpers(pos, color):
+    """Bitboard of ``color``'s pieces that have at least one capture"""
+    own = own_pieces(pos, color)
+    other = own_pieces(pos, opponent(color))
+    empty = empty_squares(pos)
+    result = 0
+    for direction in ALL_DIRECTIONS:
+        pieces = own if direction in _forward(color) else own & pos.kings
+        if not pieces:
+            continue
+        back = OPPOSITE[direction]
+        # Squares behind an opponent piece that lies next to an empty square
+        result |= shift(shift(empty, back) & other, back) & pieces
+    return result
+
+
+def piece_directions(pos, s, color):
+    """Directions the piece on ``s`` may travel in"""
+    return ALL_DIRECTIONS if pos.kings >> s & 1 else _forward(color)
+
+
+def has_jump_from(pos, s, color):
+    """Check whether the piece on square ``s`` has a capture available"""
+    other = own_pieces(pos, opponent(color))
+    occupied = pos.red | pos.black
+    for direction in piece_directions(pos, s, color):
+        landing = LANDING[direction][s]
+        if landing < 0 or occupied >> landing & 1:
+            continue
+        if other >> NEIGHBOUR[direction][s] & 1:
+            return True
+    return False
+
+
+def has_any_moves(pos, color):
+    """Check whether ``color`` has any step or capture available"""
+    return bool(movers(pos, color) or jumpers(pos, color))
+
+
+def is_valid_step(pos, from_sq, to_sq, color):
+    """Validate a single step or single jump for ``color``.
+
+    Mirrors the historic ``is_valid_move`` semantics: a capture is not forced
+    here, the caller decides whether to enforce it.
+    """
+    if from_sq < 0 or to_sq < 0:
+        return False
+    if not own_pieces(pos, color) >> from_sq & 1:
+        return False
+    if (pos.red | pos.black) >> to_sq & 1:
+        return False
+    other = own_pieces(pos, opponent(color))
+    for direction in piece_directions(pos, from_sq, color):
+        if NEIGHBOUR[direction][from_sq] == to_sq:
+            return True
+        if LANDING[direction][from_sq] == to_sq:
+            return bool(other >> NEIGHBOUR[direction][from_sq] & 1)
+    return False
+
+
+def is_jump(from_sq, to_sq):
+    """Check whether a step between two squares spans a captured square"""
+    return abs(square_coords(to_sq)[0] - square_coords(from_sq)[0]) == 2
+
+
+def captured_square(from_sq, to_sq):
+    """Return the square jumped over by a capture from ``from_sq`` to ``to_sq``"""
+    for direction in ALL_DIRECTIONS:
+        if LANDING[direction][from_sq] == to_sq:
+            return NEIGHBOUR[direction][from_sq]
+    return -1
+
+
+def apply_step(pos, from_sq, to_sq, color):
+    """Apply an already validated step and return ``(position, captured, promoted)``.
+
+    ``captured`` is the captured square or -1.  A man reaching the far row is
+    crowned, which ends the turn.
+    """
+    red, black, kings = pos
+    move_mask = (1 << from_sq) | (1 << to_sq)
+    was_king = kings >> from_sq & 1
+    if color == RED:
+        red ^= move_mask
+    else:
+        black ^= move_mask
+    if was_king:
+        kings ^= move_mask
+
+    captured = -1
+    if is_jump(from_sq, to_sq):
+        captured = captured_square(from_sq, to_sq)
+        clear = ~(1 << captured)
+        red &= clear
+        black &= clear
+        kings &= clear
+
+    promoted = False
+    promotion_row = TOP_ROW if color == RED else BOTTOM_ROW
+    if not was_king and (1 << to_sq) & promotion_row:
+        kings |= 1 << to_sq
+        promoted = True
+
+    return Position(red, black, kings), captured, promoted
+
+
+def check_winner(pos, current_player):
+    """Return ``current_player`` if their opponent has no pieces or no moves.
+
+    Call it with the side that has just moved: the opponent is the side that
+    would have to reply.
+    """
+    other = opponent(current_player)
+    if not own_pieces(pos, other):
+        return current_player
+    if not has_any_moves(pos, other):
+        return current_player
+    return None
+
+
+def _capture_paths(pos, s, color):
+    """Yield every complete capture sequence starting on square ``s``"""
+    other = own_pieces(pos, opponent(color))
+    occupied = pos.red | pos.black
+    found = False
+    for direction in piece_directions(pos, s, color):
+        landing = LANDING[direction][s]
+        if landing < 0 or occupied >> landing & 1:
+            continue
+        if not other >> NEIGHBOUR[direction][s] & 1:
+            continue
+        found = True
+        after, _, promoted = apply_step(pos, s, landing, color)
+        if promoted:
+            yield (s, landing)
+            continue
+        for tail in _capture_paths(after, landing, color):
+            yield (s,) + tail
+    if not found:
+        yield (s,)
+
+
+def legal_moves(pos, color, from_sq=None):
+    """List every legal move for ``color`` as a tuple of squares.
+
+    A step is ``(from, to)``; a capture lists every landing square of the full
+    multi-jump chain.  Captures are mandatory, and a man that is crowned stops
+    jumping.  ``from_sq`` restricts the result to one piece, which is used to
+    continue a chain that is already in progress.
+    """
+    pieces = jumpers(pos, color)
+    if from_sq is not None:
+        pieces &= 1 << from_sq
+    if pieces:
+        moves = []
+        for s in bits(pieces):
+            moves.extend(_capture_paths(pos, s, color))
+        return moves
+    if from_sq is not None:
+        return []
+
+    moves = []
+    empty = empty_squares(pos)
+    for s in bits(movers(pos, color)):
+        for direction in piece_directions(pos, s, color):
+            target = NEIGHBOUR[direction][s]
+            if target >= 0 and empty >> target & 1:
+                moves.append((s, target))
+    return moves
+
+
+def piece_mobility(pos, s):
+    """Return ``(steps, jumps)`` for the piece on ``s``.
+
+    These are the directions it can step or capture in; capture chains are
+    not followed.
+    """
+    color = RED if pos.red >> s & 1 else BLACK
+    other = own_pieces(pos, opponent(color))
+    occupied = pos.red | pos.black
+    steps = jumps = 0
+    for direction in piece_directions(pos, s, color):
+        target = NEIGHBOUR[direction][s]
+        if target < 0:
+            continue
+        if not occupied >> target & 1:
+            steps += 1
+        elif other >> target & 1:
+            landing = LANDING[direction][s]
+            if landing >= 0 and not occupied >> landing & 1:
+                jumps += 1
+    return steps, jumps
+
+
+def _around(s):
+    around = 1 << s
+    for direction in ALL_DIRECTIONS:
+        for table in (NEIGHBOUR, LANDING):
+            if table[direction][s] >= 0:
+                around |= 1 << table[direction][s]
+    return around
+
+
+# AROUND[s]: ``s`` and every square one or two diagonal steps from it.  A
+# piece's mobility only depends on these squares, and the relation is
+# symmetric, so a change on ``s`` only affects pieces inside AROUND[s].
+AROUND = [_around(s) for s in range(32)]
+
+
+def _count(summary, pos, s, sign):
+    side = summary[RED if pos.red >> s & 1 else BLACK]
+    steps, jumps = piece_mobility(pos, s)
+    side['pieces'] += sign
+    side['kings'] += sign * (pos.kings >> s & 1)
+    side['steps'] += sign * steps
+    side['jumps'] += sign * jumps
+
+
+def summarize(pos):
+    """Piece, king, step and capture counts of both sides, from scratch"""
+    summary = {color: {'pieces': 0, 'kings': 0, 'steps': 0, 'jumps': 0} for color in (RED, BLACK)}
+    for s in bits(pos.red | pos.black):
+        _count(summary, pos, s, 1)
+    return summary
+
+
+def update_summary(summary, before, after):
+    """Return the summary of ``after`` given the summary of ``before``.
+
+    Only pieces near a changed square are counted again, so the cost follows
+    the size of the move, not of the board.
+    """
+    changed = (before.red ^ after.red) | (before.black ^ after.black) | (before.kings ^ after.kings)
+    affected = 0
+    for s in bits(changed):
+        affected |= AROUND[s]
+    result = {color: dict(counts) for color, counts in summary.items()}
+    for s in bits(affected & (before.red | before.black)):
+        _count(result, before, s, -1)
+    for s in bits(affected & (after.red | after.black)):
+        _count(result, after, s, 1)
+    return result
+
+
+def summary_winner(summary, current_player):
+    """``check_winner`` answered from a summary instead of the position"""
+    other = summary[opponent(current_player)]
+    if not other['pieces'] or not (other['steps'] or other['jumps']):
+        return current_player
+    return None
+
+
+PACKED_PIECES = '.rbRB'
+
+
+def to_packed(pos):
+    """Encode a Position as a 32-character string, one character per square.
+
+    Empty squares are ``.``; pieces use the same letters as the ``board``
+    list (``r``, ``b``, ``R``, ``B``).
+    """
+    chars = []
+    for s in range(32):
+        bit = 1 << s
+        if pos.red & bit:
+            chars.append('R' if pos.kings & bit else 'r')
+        elif pos.black & bit:
+            chars.append('B' if pos.kings & bit else 'b')
+        else:
+            chars.append('.')
+    return ''.join(chars)
+
+
+def from_packed(packed):
+    """Decode a string written by ``to_packed``"""
+    if len(packed) != 32 or not set(packed) <= set(PACKED_PIECES):
+        raise ValueError(f"Invalid packed board: {packed!r}")
+    red = black = kings = 0
+    for s, piece in enumerate(packed):
+        if piece == '.':
+            continue
+        bit = 1 << s
+        if piece in 'rR':
+            red |= bit
+        else:
+            black |= bit
+        if piece.isupper():
+            kings |= bit
+    return Position(red, black, kings)
@@ -0,0 +1,30 @@
+"""Record finished games in the players' statistics from the game table's stream.
+
+The stream delivers every write of a game item.  Items that are finished
+but lack the ``statsRecorded`` marker are passed to ``game.update_stats``,
+which sets the marker in the same transaction as the counters, so replays
+of a record change nothing.  Keeping this off the request that finished the
+game saves it a transactional round trip, and a failure here is retried by
+Lambda instead of being dropped.
+"""
+import dynamo
+import game
+import log
+
+
+def handler(event, context):
+    """DynamoDB Streams handler; reports the first failed record for a retry"""
+    for record in event.get('Records', []):
+        image = record.get('dynamodb', {}).get('NewImage')
+        if record.get('eventName') == 'REMOVE' or not image:
+            continue
+        item = dynamo.deserialize_item(image)
+        if not game.needs_stats(item):
+            continue
+        try:
+            game.update_stats(item)
+        except Exception as e:
+            log.error('Error updating stats', gameId=item.get('gameId'), error=str(e))
+            # Records of a shard are retried from here on, in order
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+    return {'batchItemFailures': []}
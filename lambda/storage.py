@@ -0,0 +1,297 @@
+"""Storage backends for the game and stats tables.
+
+The handler talks to a table through six operations: ``get``, ``put``,
+``update`` (optionally conditional on attribute values), ``delete``,
+``query`` on a partition of the table or of an index, one page at a time,
+and ``batch_get`` of up to ``MAX_BATCH_KEYS`` items by key.  Tables have a
+partition ``key`` and optionally a ``sort_key``.  ``transact`` applies
+several updates, possibly on different tables, all or nothing.
+``DynamoTable`` maps them onto DynamoDB; ``MemoryTable`` keeps items in a
+dict behind a lock, with the same condition and pagination behaviour, so
+the full handler runs without AWS::
+
+    STORAGE_BACKEND=memory python benchmarks/handler_load.py
+
+Items come back as new dicts; changing them does not change the table.
+"""
+import contextlib
+import copy
+import os
+import random
+import threading
+import time
+
+import dynamo
+
+ConditionFailed = dynamo.ConditionFailed
+
+MEMORY, DYNAMODB = 'memory', 'dynamodb'
+
+# BatchGetItem accepts at most this many keys per call
+MAX_BATCH_KEYS = 100
+# Retries of keys DynamoDB leaves unprocessed, and the first backoff in seconds
+BATCH_RETRIES = 6
+BATCH_BACKOFF = 0.05
+
+
+def _project(item, attributes):
+    if attributes is None:
+        return item
+    return {attribute: item[attribute] for attribute in attributes if attribute in item}
+
+
+class DynamoTable:
+    """A DynamoDB table, addressed through ``dynamo.Table``"""
+
+    def __init__(self, name, key, indexes=None, sort_key=None):
+        self.name = name
+        self.key = key
+        self.sort_key = sort_key
+        self.indexes = indexes or {}
+        self._table = dynamo.Table(name)
+
+    def get(self, key):
+        """Return the item with this key, or ``None``"""
+        return self._table.get_item(Key=key).get('Item')
+
+    def put(self, item, if_absent=False):
+        """Write a whole item; with ``if_absent`` an existing item is a ConditionFailed"""
+        kwargs = {'Item': item}
+        if if_absent:
+            kwargs['ConditionExpression'] = 'attribute_not_exists(#key)'
+            kwargs['ExpressionAttributeNames'] = {'#key': self.key}
+        self._table.put_item(**kwargs)
+
+    def delete(self, key):
+        """Remove the item with this key, if there is one"""
+        self._table.delete_item(Key=key)
+
+    def batch_get(self, keys, attributes=None):
+        """Read up to ``MAX_BATCH_KEYS`` distinct items; missing ones are left out.
+
+        ``attributes`` limits the attributes returned.  Keys DynamoDB leaves
+        unprocessed are retried with exponential backoff and jitter.
+        """
+        params = {'Keys': list(keys)}
+        if attributes is not None:
+            names = {f'#p{i}': attribute for i, attribute in enumerate(attributes)}
+            params['ProjectionExpression'] = ', '.join(names)
+            params['ExpressionAttributeNames'] = names
+        items = []
+        pending = {self.name: params}
+        for attempt in range(BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(random.uniform(0, BATCH_BACKOFF * 2 ** attempt))
+            found, pending = dynamo.batch_get(pending)
+            items.extend(found.get(self.name, []))
+            if not pending:
+                return items
+        raise RuntimeError(f"{len(pending[self.name]['Keys'])} keys still unprocessed after {BATCH_RETRIES} retries")
+
+    def update(self, key, set=None, remove=(), expected=None, add=None, below=None):
+        """Set, remove and increment attributes of one item.
+
+        ``expected`` maps attribute names to the value they must hold for the
+        write to happen, ``None`` meaning the attribute must be absent.
+        ``below`` maps attribute names to a value they must be less than, or
+        be absent.  ``add`` maps numeric attributes to the amount added
+        atomically (starting from 0 when the attribute is missing).
+        """
+        self._table.update_item(**self.update_request(key, set, remove, expected, add, below))
+
+    def update_request(self, key, set=None, remove=(), expected=None, add=None, below=None):
+        """Build the UpdateItem parameters for ``update``"""
+        names, values = {}, {}
+        assignments, removals, additions, conditions = [], [], [], []
+        for i, (attribute, value) in enumerate((set or {}).items()):
+            names[f'#s{i}'] = attribute
+            values[f':s{i}'] = value
+            assignments.append(f'#s{i} = :s{i}')
+        for i, (attribute, value) in enumerate((add or {}).items()):
+            names[f'#n{i}'] = attribute
+            values[f':n{i}'] = value
+            additions.append(f'#n{i} :n{i}')
+        for i, attribute in enumerate(remove):
+            names[f'#r{i}'] = attribute
+            removals.append(f'#r{i}')
+        for i, (attribute, value) in enumerate((expected or {}).items()):
+            names[f'#c{i}'] = attribute
+            if value is None:
+                conditions.append(f'attribute_not_exists(#c{i})')
+            else:
+                values[f':c{i}'] = value
+                conditions.append(f'#c{i} = :c{i}')
+        for i, (attribute, value) in enumerate((below or {}).items()):
+            names[f'#b{i}'] = attribute
+            values[f':b{i}'] = value
+            conditions.append(f'(attribute_not_exists(#b{i}) OR #b{i} < :b{i})')
+
+        expression = []
+        if assignments:
+            expression.append(f"SET {', '.join(assignments)}")
+        if removals:
+            expression.append(f"REMOVE {', '.join(removals)}")
+        if additions:
+            expression.append(f"ADD {', '.join(additions)}")
+        kwargs = {'Key': key, 'UpdateExpression': ' '.join(expression), 'ExpressionAttributeNames': names}
+        if values:
+            kwargs['ExpressionAttributeValues'] = values
+        if conditions:
+            kwargs['ConditionExpression'] = ' AND '.join(conditions)
+        return kwargs
+
+    def query(self, index, partition, limit, start_key=None, forward=True):
+        """Read one page of a partition in sort key order.
+
+        ``index`` names the index to read, or is ``None`` for the table
+        itself.  Returns ``(items, last_key)``; ``last_key`` is ``None`` on
+        the last page and otherwise goes back in as ``start_key``.
+        """
+        name, value = partition
+        kwargs = {
+            'KeyConditionExpression': '#pk = :pk',
+            'ExpressionAttributeNames': {'#pk': name},
+            'ExpressionAttributeValues': {':pk': value},
+            'ScanIndexForward': forward,
+            'Limit': limit
+        }
+        if index is not None:
+            kwargs['IndexName'] = index
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = self._table.query(**kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+
+class MemoryTable:
+    """A thread-safe in-process table with DynamoDB's conditions and paging.
+
+    ``indexes`` maps an index name to ``(partition key, sort key, projected
+    attributes)``; as in DynamoDB, items missing either index key are left
+    out of the index, and a page that fills ``limit`` returns a ``last_key``
+    even when nothing follows it.
+    """
+
+    def __init__(self, name, key, indexes=None, sort_key=None):
+        self.name = name
+        self.key = key
+        self.sort_key = sort_key
+        self.indexes = indexes or {}
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def _id(self, key):
+        return (key[self.key], key[self.sort_key]) if self.sort_key else key[self.key]
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(self._id(key))
+            return copy.deepcopy(item) if item is not None else None
+
+    def put(self, item, if_absent=False):
+        with self._lock:
+            if if_absent and self._id(item) in self._items:
+                raise ConditionFailed(f"{self.key} {item[self.key]} already exists")
+            self._items[self._id(item)] = copy.deepcopy(item)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(self._id(key), None)
+
+    def batch_get(self, keys, attributes=None):
+        with self._lock:
+            found = [self._items.get(self._id(key)) for key in keys]
+            return [copy.deepcopy(_project(item, attributes)) for item in found if item is not None]
+
+    def update(self, key, set=None, remove=(), expected=None, add=None, below=None):
+        with self._lock:
+            self._check(key, expected, below)
+            self._apply(key, set, remove, add)
+
+    def _check(self, key, expected, below=None):
+        item = self._items.get(self._id(key), {})
+        for attribute, value in (expected or {}).items():
+            if item.get(attribute) != value:
+                raise ConditionFailed(f"{attribute} is {item.get(attribute)!r}, expected {value!r}")
+        for attribute, value in (below or {}).items():
+            if item.get(attribute) is not None and not item[attribute] < value:
+                raise ConditionFailed(f"{attribute} is {item[attribute]!r}, expected below {value!r}")
+
+    def _apply(self, key, set=None, remove=(), add=None):
+        item = {**self._items.get(self._id(key), {}), **copy.deepcopy(set or {}), **key}
+        for attribute in remove:
+            item.pop(attribute, None)
+        for attribute, value in (add or {}).items():
+            item[attribute] = item.get(attribute, 0) + value
+        self._items[self._id(key)] = item
+
+    def query(self, index, partition, limit, start_key=None, forward=True):
+        if index is None:
+            partition_key, sort_key = self.key, self.sort_key
+            project = copy.deepcopy
+        else:
+            partition_key, sort_key, projection = self.indexes[index]
+            attributes = {self.key, partition_key, sort_key, *projection}
+            project = lambda item: {attribute: copy.deepcopy(item[attribute]) for attribute in attributes if attribute in item}
+        name, value = partition
+        with self._lock:
+            matching = [project(item) for item in self._items.values() if item.get(name) == value and sort_key in item]
+
+        position = lambda item: (item[sort_key], item[self.key])
+        matching.sort(key=position, reverse=not forward)
+        if start_key:
+            start = position(start_key)
+            matching = [item for item in matching if (position(item) > start) == forward and position(item) != start]
+
+        page = matching[:limit]
+        last_key = None
+        if len(page) == limit:
+            last_key = {attribute: page[-1][attribute] for attribute in (self.key, self.sort_key, partition_key, sort_key) if attribute}
+        return page, last_key
+
+
+# Memory tables live as long as the process, so warm invocations share them
+_memory_tables = {}
+_memory_lock = threading.Lock()
+
+
+def backend():
+    """The storage backend named by ``STORAGE_BACKEND`` (DynamoDB by default)"""
+    name = os.environ.get('STORAGE_BACKEND', DYNAMODB).lower()
+    if name not in (MEMORY, DYNAMODB):
+        raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+    return name
+
+
+def transact(updates):
+    """Apply ``(table, key, update arguments)`` updates all or nothing.
+
+    Raises ``ConditionFailed`` and writes nothing when any ``expected``
+    condition does not hold.
+    """
+    if backend() == DYNAMODB:
+        dynamo.transact_write([
+            {'Update': {'TableName': table.name, **table.update_request(key, **arguments)}}
+            for table, key, arguments in updates
+        ])
+        return
+    tables = sorted({id(table): table for table, _, _ in updates}.values(), key=lambda table: table.name)
+    with contextlib.ExitStack() as stack:
+        for table in tables:
+            stack.enter_context(table._lock)
+        for table, key, arguments in updates:
+            table._check(key, arguments.get('expected'), arguments.get('below'))
+        for table, key, arguments in updates:
+            table._apply(key, arguments.get('set'), arguments.get('remove', ()), arguments.get('add'))
+
+
+def table(name, key, indexes=None, sort_key=None):
+    """Open a table on the configured backend"""
+    if backend() == DYNAMODB:
+        return DynamoTable(name, key, indexes, sort_key)
+    with _memory_lock:
+        if name not in _memory_tables:
+            _memory_tables[name] = MemoryTable(name, key, sort_key=sort_key)
+        # Modules opening the same table may each know only the indexes they use
+        _memory_tables[name].indexes.update(indexes or {})
+        return _memory_tables[name]
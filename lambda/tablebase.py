@@ -0,0 +1,322 @@
+"""Endgame tablebase: offline retrograde generator and mmap-backed probe.
+
+Every position with at most ``max_pieces`` pieces gets one byte:
+
+* ``0``           draw (or a placement that cannot occur in a game)
+* ``1..127``      side to move wins in that many plies
+* ``128..255``    side to move loses in ``value - 128`` plies
+
+Positions are grouped by material signature ``(red men, red kings, black men,
+black kings)``.  Inside a signature each piece group is ranked among the
+squares the earlier groups left free (combinatorial number system), and the
+side to move is the lowest index bit, so a probe is a handful of integer
+operations and a single byte read.
+
+Generate a table with::
+
+    python lambda/tablebase.py --pieces 4 --output lambda/data/endgame.cktb
+
+Signatures are solved from fewest pieces and most kings upwards, so captures
+and promotions only ever lead into signatures that are already solved.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from itertools import combinations
+from math import comb
+
+import log
+import rules
+
+MAGIC = b'CKTB'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBBH')
+SIGNATURE_ENTRY = struct.Struct('<BBBBQ')
+
+DRAW, WIN, LOSS = 'draw', 'win', 'loss'
+MAX_DISTANCE = 127
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'endgame.cktb')
+
+
+def _popcount(bb):
+    return bin(bb).count('1')
+
+
+def signature(pos):
+    """Material signature of a position"""
+    return (
+        _popcount(pos.red & ~pos.kings),
+        _popcount(pos.red & pos.kings),
+        _popcount(pos.black & ~pos.kings),
+        _popcount(pos.black & pos.kings),
+    )
+
+
+def block_size(sig):
+    """Number of entries (both sides to move) for a signature"""
+    size = 2
+    free = 32
+    for count in sig:
+        size *= comb(free, count)
+        free -= count
+    return size
+
+
+def _rank_group(group, occupied):
+    """Colex rank of the squares in ``group`` among the squares not in ``occupied``"""
+    rank = 0
+    i = 0
+    for s in rules.bits(group):
+        i += 1
+        rank += comb(s - _popcount(occupied & ((1 << s) - 1)), i)
+    return rank
+
+
+def local_index(pos, color, sig):
+    """Index of a position inside its signature block"""
+    groups = (pos.red & ~pos.kings, pos.red & pos.kings, pos.black & ~pos.kings, pos.black & pos.kings)
+    index = 0
+    occupied = 0
+    free = 32
+    for group, count in zip(groups, sig):
+        index = index * comb(free, count) + _rank_group(group, occupied)
+        occupied |= group
+        free -= count
+    return index * 2 + (color == rules.BLACK)
+
+
+def _encode(result, distance):
+    if result == WIN:
+        return min(distance, MAX_DISTANCE)
+    if result == LOSS:
+        return 128 + min(distance, MAX_DISTANCE)
+    return 0
+
+
+def _decode(value):
+    if value == 0:
+        return DRAW, None
+    if value < 128:
+        return WIN, value
+    return LOSS, value - 128
+
+
+def signatures(max_pieces):
+    """Signatures with both sides on the board, in the order they can be solved"""
+    result = []
+    for total in range(2, max_pieces + 1):
+        for red_men in range(total + 1):
+            for red_kings in range(total + 1 - red_men):
+                for black_men in range(total + 1 - red_men - red_kings):
+                    black_kings = total - red_men - red_kings - black_men
+                    if red_men + red_kings and black_men + black_kings:
+                        result.append((red_men, red_kings, black_men, black_kings))
+    # Promotions turn a man into a king without changing the piece count
+    result.sort(key=lambda sig: (sum(sig), sig[0] + sig[2]))
+    return result
+
+
+def _placements(sig):
+    """Yield every legal Position for a signature"""
+    red_men, red_kings, black_men, black_kings = sig
+    all_squares = range(32)
+    for rm in combinations(all_squares, red_men):
+        # A man on its crowning row would already be a king
+        if any(s < 4 for s in rm):
+            continue
+        rm_bb = sum(1 << s for s in rm)
+        for rk in combinations([s for s in all_squares if not rm_bb >> s & 1], red_kings):
+            rk_bb = sum(1 << s for s in rk)
+            taken = rm_bb | rk_bb
+            for bm in combinations([s for s in all_squares if not taken >> s & 1], black_men):
+                if any(s >= 28 for s in bm):
+                    continue
+                bm_bb = sum(1 << s for s in bm)
+                taken_b = taken | bm_bb
+                for bk in combinations([s for s in all_squares if not taken_b >> s & 1], black_kings):
+                    bk_bb = sum(1 << s for s in bk)
+                    yield rules.Position(rm_bb | rk_bb, bm_bb | bk_bb, rk_bb | bk_bb)
+
+
+def _solve_signature(sig, solved):
+    """Retrograde analysis of one signature block.
+
+    ``solved`` maps already finished signatures to their bytearrays; moves
+    that leave the signature are looked up there.  Inside the block a
+    bucket queue ordered by distance gives the shortest wins and longest
+    losses.
+    """
+    size = block_size(sig)
+    values = bytearray(size)
+    final = bytearray(size)
+    remaining = {}
+    longest_win = {}
+    tentative = {}
+    predecessors = {}
+    drawable = set()
+    buckets = {}
+
+    def push(distance, index, result):
+        buckets.setdefault(distance, []).append((index, result))
+
+    for pos in _placements(sig):
+        for color in (rules.RED, rules.BLACK):
+            index = local_index(pos, color, sig)
+            moves = rules.legal_moves(pos, color)
+            if not moves:
+                push(0, index, LOSS)
+                continue
+
+            other = rules.opponent(color)
+            internal = 0
+            best_win = None
+            longest = 0
+            drawn = False
+            for move in moves:
+                child = pos
+                for hop_from, hop_to in zip(move, move[1:]):
+                    child, _, _ = rules.apply_step(child, hop_from, hop_to, color)
+                if not rules.own_pieces(child, other):
+                    child_result, child_distance = LOSS, 0
+                else:
+                    child_sig = signature(child)
+                    child_index = local_index(child, other, child_sig)
+                    if child_sig == sig:
+                        predecessors.setdefault(child_index, []).append(index)
+                        internal += 1
+                        continue
+                    child_result, child_distance = _decode(solved[child_sig][child_index])
+                if child_result == LOSS:
+                    if best_win is None or child_distance + 1 < best_win:
+                        best_win = child_distance + 1
+                elif child_result == WIN:
+                    longest = max(longest, child_distance + 1)
+                else:
+                    drawn = True
+
+            if best_win is not None:
+                tentative[index] = best_win
+                push(best_win, index, WIN)
+            if internal:
+                remaining[index] = internal
+                longest_win[index] = longest
+                if drawn:
+                    # A drawing move out of the block means this side never loses
+                    drawable.add(index)
+            elif best_win is None and not drawn:
+                push(longest, index, LOSS)
+
+    distance = 0
+    while buckets:
+        for index, result in buckets.pop(distance, []):
+            if final[index]:
+                continue
+            final[index] = 1
+            values[index] = _encode(result, distance)
+            for pred in predecessors.get(index, ()):
+                if final[pred]:
+                    continue
+                if result == LOSS:
+                    if pred not in tentative or distance + 1 < tentative[pred]:
+                        tentative[pred] = distance + 1
+                        push(distance + 1, pred, WIN)
+                else:
+                    remaining[pred] -= 1
+                    longest_win[pred] = max(longest_win[pred], distance + 1)
+                    if not remaining[pred] and pred not in tentative and pred not in drawable:
+                        push(longest_win[pred], pred, LOSS)
+        distance += 1
+    return values
+
+
+def solve(max_pieces, progress=sys.stderr):
+    """Solve every signature up to ``max_pieces`` pieces"""
+    solved = {}
+    for sig in signatures(max_pieces):
+        start = time.perf_counter()
+        solved[sig] = _solve_signature(sig, solved)
+        print(f"{sig}: {len(solved[sig])} entries in {time.perf_counter() - start:.1f}s", file=progress)
+    return solved
+
+
+def write(output, max_pieces, solved):
+    """Write solved signature blocks to a tablebase file"""
+    order = list(solved)
+    offset = HEADER.size + SIGNATURE_ENTRY.size * len(order)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, max_pieces, len(order)))
+        for sig in order:
+            f.write(SIGNATURE_ENTRY.pack(*sig, offset))
+            offset += len(solved[sig])
+        for sig in order:
+            f.write(solved[sig])
+
+
+def generate(max_pieces, output, progress=sys.stderr):
+    """Solve every signature up to ``max_pieces`` pieces and write the file"""
+    write(output, max_pieces, solve(max_pieces, progress))
+
+
+class Tablebase:
+    """Read-only view of a generated file; only the header is parsed up front"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_pieces, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} tablebase")
+        self._offsets = {}
+        for i in range(count):
+            *sig, offset = SIGNATURE_ENTRY.unpack_from(self._map, HEADER.size + i * SIGNATURE_ENTRY.size)
+            self._offsets[tuple(sig)] = offset
+
+    def probe(self, pos, color):
+        """Return ``(result, distance)`` for ``color`` to move, or ``None`` if not covered"""
+        if _popcount(pos.red | pos.black) > self.max_pieces:
+            return None
+        if not pos.red or not pos.black:
+            return None
+        sig = signature(pos)
+        offset = self._offsets.get(sig)
+        if offset is None:
+            return None
+        return _decode(self._map[offset + local_index(pos, color, sig)])
+
+    def close(self):
+        self._map.close()
+
+
+_default = None
+
+
+def default_tablebase():
+    """Open the tablebase shipped with the Lambda asset on first use, if present"""
+    global _default
+    if _default is None:
+        path = os.environ.get('TABLEBASE_PATH', DEFAULT_PATH)
+        if os.path.exists(path):
+            _default = Tablebase(path)
+            log.info('Endgame tablebase loaded', path=path, maxPieces=_default.max_pieces)
+        else:
+            # The bot still plays, but endgames fall back to plain search
+            log.warning('Endgame tablebase missing', path=path)
+            _default = False
+    return _default or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a checkers endgame tablebase')
+    parser.add_argument('--pieces', type=int, default=4, help='maximum number of pieces on the board')
+    parser.add_argument('--output', default=DEFAULT_PATH, help='file to write')
+    args = parser.parse_args(argv)
+    generate(args.pieces, args.output)
+
+
+if __name__ == '__main__':
+    main()
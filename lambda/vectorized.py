@@ -0,0 +1,180 @@
+"""NumPy versions of the rules queries for whole batches of positions.
+
+A batch is either an ``(N, 3)`` uint32 array of ``(red, black, kings)``
+bitboards, laid out like ``rules.Position``, or an ``(N, 8, 8)`` int8 array
+of boards using ``PIECE_CODES`` (red positive, black negative, kings 2).
+Every function takes either and returns one value per position, computed
+with the same masked shifts as ``rules`` so results match it exactly.
+
+``color`` arguments are ``'red'``/``'black'`` for the whole batch, or an
+array of them (or of booleans, ``True`` meaning black) for one side per
+position.
+
+NumPy is only needed for analytics and tuning; nothing the Lambda serves
+imports this module.
+"""
+import numpy as np
+
+import rules
+
+PIECE_CODES = {'': 0, 'r': 1, 'R': 2, 'b': -1, 'B': -2}
+# check_winner results: the winning side's sign, 0 when nobody has won
+WINNER_CODES = {rules.RED: 1, rules.BLACK: -1, None: 0}
+
+_U32 = np.uint32
+_FULL = _U32(rules.FULL)
+_EVEN_ROWS = _U32(rules.EVEN_ROWS)
+_ODD_ROWS = _U32(rules.ODD_ROWS)
+_EVEN_NOT_LEFT = _U32(rules.EVEN_ROWS & ~rules.LEFT_EDGE & rules.FULL)
+_ODD_NOT_RIGHT = _U32(rules.ODD_ROWS & ~rules.RIGHT_EDGE & rules.FULL)
+
+# Bit of each board square, zero on the light squares
+_SQUARE_BITS = np.zeros((8, 8), dtype=np.uint64)
+for _s in range(32):
+    _SQUARE_BITS[rules.square_coords(_s)] = 1 << _s
+
+
+def from_boards(boards):
+    """Convert a list of 8x8 ``board`` lists into an ``(N, 8, 8)`` int8 array"""
+    return np.array([[[PIECE_CODES[piece] for piece in row] for row in board] for board in boards], dtype=np.int8)
+
+
+def from_positions(positions):
+    """Convert a list of ``rules.Position`` into an ``(N, 3)`` uint32 array"""
+    return np.array(positions, dtype=np.uint32).reshape(-1, 3)
+
+
+def to_bitboards(batch):
+    """Return the ``(N, 3)`` bitboard form of either batch layout"""
+    batch = np.asarray(batch)
+    if batch.ndim == 3:
+        def collect(mask):
+            return np.where(mask, _SQUARE_BITS, 0).sum(axis=(1, 2), dtype=np.uint64).astype(np.uint32)
+        return np.stack([collect(batch > 0), collect(batch < 0), collect(np.abs(batch) == 2)], axis=1)
+    if batch.ndim != 2 or batch.shape[1] != 3:
+        raise ValueError(f"Expected an (N, 8, 8) or (N, 3) array, got shape {batch.shape}")
+    return batch.astype(np.uint32, copy=False)
+
+
+def popcount(bb):
+    """Number of set bits of every uint32 in ``bb``"""
+    bb = bb - ((bb >> 1) & _U32(0x55555555))
+    bb = (bb & _U32(0x33333333)) + ((bb >> 2) & _U32(0x33333333))
+    bb = (bb + (bb >> 4)) & _U32(0x0F0F0F0F)
+    return ((bb * _U32(0x01010101)) >> 24).astype(np.int64)
+
+
+def shift(bb, direction):
+    """``rules.shift`` on an array of bitboards"""
+    if direction == rules.UP_LEFT:
+        return ((bb & _EVEN_NOT_LEFT) >> 5) | ((bb & _ODD_ROWS) >> 4)
+    if direction == rules.UP_RIGHT:
+        return ((bb & _EVEN_ROWS) >> 4) | ((bb & _ODD_NOT_RIGHT) >> 3)
+    if direction == rules.DOWN_LEFT:
+        return ((bb & _EVEN_NOT_LEFT) << 3) | ((bb & _ODD_ROWS) << 4)
+    return ((bb & _EVEN_ROWS) << 4) | ((bb & _ODD_NOT_RIGHT) << 5)
+
+
+def _per_color(color, function, bbs):
+    """Apply ``function(bbs, color)`` for one colour or a per-position array of them"""
+    if isinstance(color, str):
+        return function(bbs, color)
+    color = np.asarray(color)
+    black = color if color.dtype == bool else color == rules.BLACK
+    return np.where(black, function(bbs, rules.BLACK), function(bbs, rules.RED))
+
+
+def _sides(bbs, color):
+    red, black, kings = bbs[:, 0], bbs[:, 1], bbs[:, 2]
+    return (red, black, kings) if color == rules.RED else (black, red, kings)
+
+
+def _steps(bbs, color):
+    """``(direction, bitboard of pieces that can step that way)`` pairs"""
+    own, other, kings = _sides(bbs, color)
+    empty = ~(own | other) & _FULL
+    for direction in rules.ALL_DIRECTIONS:
+        pieces = own if direction in rules._forward(color) else own & kings
+        yield shift(empty, rules.OPPOSITE[direction]) & pieces
+
+
+def _jumps(bbs, color):
+    """Bitboards of pieces that can capture in each direction"""
+    own, other, kings = _sides(bbs, color)
+    empty = ~(own | other) & _FULL
+    for direction in rules.ALL_DIRECTIONS:
+        pieces = own if direction in rules._forward(color) else own & kings
+        back = rules.OPPOSITE[direction]
+        yield shift(shift(empty, back) & other, back) & pieces
+
+
+def _movers(bbs, color):
+    return np.bitwise_or.reduce(list(_steps(bbs, color)))
+
+
+def _jumpers(bbs, color):
+    return np.bitwise_or.reduce(list(_jumps(bbs, color)))
+
+
+def _mobility(bbs, color):
+    steps = sum(popcount(pieces) for pieces in _steps(bbs, color))
+    jumps = sum(popcount(pieces) for pieces in _jumps(bbs, color))
+    return np.where(jumps > 0, jumps, steps)
+
+
+def _has_any_moves(bbs, color):
+    return (_movers(bbs, color) | _jumpers(bbs, color)) != 0
+
+
+def _check_winner(bbs, current_player):
+    other = rules.opponent(current_player)
+    won = ~_has_any_moves(bbs, other)
+    return np.where(won, WINNER_CODES[current_player], 0).astype(np.int8)
+
+
+def material(batch):
+    """``(N, 4)`` counts of red men, red kings, black men and black kings"""
+    bbs = to_bitboards(batch)
+    red, black, kings = bbs[:, 0], bbs[:, 1], bbs[:, 2]
+    return np.stack([popcount(red & ~kings), popcount(red & kings),
+                     popcount(black & ~kings), popcount(black & kings)], axis=1)
+
+
+def count_pieces(batch, color):
+    """``rules.count_pieces`` for every position"""
+    return _per_color(color, lambda bbs, c: popcount(_sides(bbs, c)[0]), to_bitboards(batch))
+
+
+def movers(batch, color):
+    """``rules.movers`` for every position"""
+    return _per_color(color, _movers, to_bitboards(batch))
+
+
+def jumpers(batch, color):
+    """``rules.jumpers`` for every position"""
+    return _per_color(color, _jumpers, to_bitboards(batch))
+
+
+def can_capture(batch, color):
+    """Whether ``color`` has a capture, and so must take one"""
+    return jumpers(batch, color) != 0
+
+
+def mobility(batch, color):
+    """Number of different first hops ``color`` may play.
+
+    Captures are counted instead of steps whenever one exists, as in
+    ``rules.legal_moves``; a capture chain that branches later still counts
+    once, so this is the number of distinct ``move[:2]`` of the legal moves.
+    """
+    return _per_color(color, _mobility, to_bitboards(batch))
+
+
+def has_any_moves(batch, color):
+    """``rules.has_any_moves`` for every position"""
+    return _per_color(color, _has_any_moves, to_bitboards(batch))
+
+
+def check_winner(batch, current_player):
+    """``rules.check_winner`` for every position, as ``WINNER_CODES``"""
+    return _per_color(current_player, _check_winner, to_bitboards(batch))
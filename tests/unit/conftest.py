@@ -0,0 +1,14 @@
+import os
+import sys
+
+# The Lambda asset directory is not a package ("lambda" is a keyword), so make
+# its modules importable the same way the Lambda runtime does.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'lambda'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks'))
+
+# Handler tests run against the in-memory tables instead of DynamoDB
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+# WebSocket pushes go to the in-process broker
+os.environ.setdefault('PUSH_BACKEND', 'local')
+# Every move's incremental counts are checked against a full recount
+os.environ.setdefault('DEBUG_STATE_CHECK', '1')
@@ -0,0 +1,48 @@
+import time
+
+import analysis
+import engine
+import rules
+
+
+def setup_function():
+    analysis.analysis_cache.clear()
+
+
+def test_results_are_shared_and_deeper_ones_win():
+    pos, color = rules.INITIAL, rules.RED
+    shallow = engine.search(pos, color, budget_ms=10000, max_depth=2, table={})
+    deep = engine.search(pos, color, budget_ms=10000, max_depth=4, table={})
+
+    analysis.store(pos, color, deep)
+    analysis.store(pos, color, shallow)
+    item = analysis.analysis_table.get({'positionKey': analysis.position_key(pos, color)})
+    assert item['depth'] == 4 and item['packedBoard'] == rules.to_packed(pos)
+
+    # Another container starts with an empty LRU and reads the table
+    analysis.analysis_cache.clear()
+    found = analysis.lookup(pos, color)
+    assert (found.move, found.score, found.depth, found.pv) == (deep.move, deep.score, 4, deep.pv)
+    assert analysis.lookup(pos, color, min_depth=5) is None
+    assert analysis.lookup(pos, rules.BLACK) is None
+
+    result, cached = analysis.analyse(pos, color, budget_ms=10, min_depth=4)
+    assert cached and result.move == deep.move
+
+
+def test_hash_collisions_are_misses():
+    pos, color = rules.INITIAL, rules.RED
+    analysis.store(pos, color, engine.search(pos, color, budget_ms=10000, max_depth=2, table={}))
+    key = analysis.position_key(pos, color)
+    analysis.analysis_table.update({'positionKey': key}, set={'packedBoard': '.' * 32})
+    analysis.analysis_cache.clear()
+    assert analysis.lookup(pos, color) is None
+
+
+def test_results_found_past_the_deadline_stay_in_the_container():
+    pos, color = rules.INITIAL, rules.RED
+    result = engine.search(pos, color, budget_ms=10000, max_depth=2, table={})
+    analysis.analysis_table.delete({'positionKey': analysis.position_key(pos, color)})
+    analysis.store(pos, color, result, deadline=time.perf_counter())
+    assert analysis.analysis_table.get({'positionKey': analysis.position_key(pos, color)}) is None
+    assert analysis.lookup(pos, color).depth == 2
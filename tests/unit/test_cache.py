@@ -0,0 +1,26 @@
+import cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_ttl_and_counters():
+    clock = Clock()
+    lru = cache.LRUCache(2, ttl=10, clock=clock)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)  # 'b' is the least recently used
+    assert lru.get('b') is None
+    assert lru.get('c') == 3
+
+    clock.now = 11
+    assert lru.get('a') is None
+    assert lru.stats() == {
+        'entries': 1, 'hits': 2, 'misses': 2, 'hitRate': 0.5, 'evictions': 1, 'expirations': 1
+    }
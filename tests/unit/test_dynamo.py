@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+import pytest
+
+import dynamo
+
+
+def test_item_round_trip():
+    item = {
+        'gameId': 'abc',
+        'version': 3,
+        'score': Decimal('1.5'),
+        'finished': False,
+        'winner': None,
+        'mustJumpFrom': {'row': 2, 'col': 4},
+        'players': ['red', 'bot'],
+    }
+    encoded = dynamo.serialize_item(item)
+    assert encoded['version'] == {'N': '3'}
+    assert encoded['mustJumpFrom'] == {'M': {'row': {'N': '2'}, 'col': {'N': '4'}}}
+    assert dynamo.deserialize_item(encoded) == item
+    assert dynamo.deserialize({'N': '-7'}) == -7
+
+
+def test_unsupported_value_is_rejected():
+    with pytest.raises(TypeError):
+        dynamo.serialize(object())
@@ -0,0 +1,88 @@
+import time
+
+import engine
+import rules
+import tablebase
+
+
+def empty_board():
+    return [[''] * 8 for _ in range(8)]
+
+
+def test_incremental_hash_matches_full_hash():
+    pos = rules.INITIAL
+    color = 'red'
+    h = engine.zobrist_hash(pos, color)
+    for _ in range(6):
+        move = rules.legal_moves(pos, color)[0]
+        child = engine.make_move(pos, color, move)
+        h = engine._rehash(h, pos, child)
+        pos, color = child, rules.opponent(color)
+        assert h == engine.zobrist_hash(pos, color)
+
+
+def test_search_takes_the_double_jump():
+    board = empty_board()
+    board[6][0] = 'r'
+    board[5][1] = 'b'
+    board[3][3] = 'b'
+    board[0][0] = 'b'
+    board[7][7] = 'r'
+    pos = rules.from_board(board)
+    result = engine.search(pos, 'red', budget_ms=200, table={})
+    sq = rules.square_index
+    assert result.move == (sq(6, 0), sq(4, 2), sq(2, 4))
+
+
+def test_search_finds_a_forced_win():
+    # Red king traps the last black man on the edge
+    board = empty_board()
+    board[0][0] = 'b'
+    board[2][0] = 'R'
+    board[3][3] = 'R'
+    pos = rules.from_board(board)
+    result = engine.search(pos, 'red', budget_ms=500, table={})
+    assert result.score >= engine.MATE_THRESHOLD
+
+
+def test_reused_table_keeps_the_distance_to_a_forced_win(monkeypatch):
+    # Plain search; a tablebase would answer these positions directly
+    monkeypatch.setattr(tablebase, '_default', False)
+    # Two kings against one: a win several moves deep
+    board = empty_board()
+    board[6][2] = 'R'
+    board[0][4] = 'R'
+    board[7][5] = 'B'
+    pos = rules.from_board(board)
+    table = {}
+    first = engine.search(pos, 'red', budget_ms=500, table=table)
+    # Two plies on, the table entries were stored deeper in the first search
+    for move, color in zip(first.pv[:2], ('red', 'black')):
+        pos = engine.make_move(pos, color, move)
+    reused = engine.search(pos, 'red', budget_ms=500, table=table)
+    fresh = engine.search(pos, 'red', budget_ms=500, table={})
+    assert reused.score == fresh.score == first.score + 2
+
+
+def test_search_respects_the_time_budget():
+    start = time.perf_counter()
+    result = engine.search(rules.INITIAL, 'red', budget_ms=150, table={})
+    assert time.perf_counter() - start < 1.0
+    assert result.depth >= 1
+    assert result.move in rules.legal_moves(rules.INITIAL, 'red')
+    assert result.pv[0] == result.move
+
+
+def test_search_can_be_limited_to_one_piece():
+    board = empty_board()
+    board[6][0] = 'r'
+    board[5][1] = 'b'
+    board[6][4] = 'r'
+    board[5][5] = 'b'
+    board[5][3] = 'b'
+    board[0][0] = 'b'
+    pos = rules.from_board(board)
+    sq = rules.square_index
+    result = engine.search(pos, 'red', budget_ms=200, from_sq=sq(6, 4))
+    assert result.move[0] == sq(6, 4)
+    assert result.depth >= 1
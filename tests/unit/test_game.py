@@ -0,0 +1,252 @@
+import json
+import time
+
+import analysis
+import game
+
+
+def call(method, resource, game_id=None, body=None, query=None):
+    event = {
+        'httpMethod': method,
+        'resource': resource,
+        'pathParameters': {'gameId': game_id} if game_id else None,
+        'queryStringParameters': query,
+        'requestContext': {'identity': {}},
+        'body': json.dumps(body) if body is not None else None
+    }
+    response = game.handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_create_move_and_read_back():
+    status, created = call('POST', '/games')
+    assert status == 201
+    game_id = created['gameId']
+
+    status, moved = call('PUT', '/games/{gameId}', game_id, {'path': [[5, 1], [4, 0]]})
+    assert status == 200
+    assert moved['currentPlayer'] == 'black'
+    assert moved['board'][4][0] == 'r'
+    assert moved['summary']['black']['pieces'] == 12
+
+    status, fetched = call('GET', '/games/{gameId}', game_id)
+    assert status == 200
+    assert fetched['version'] == 2
+    assert fetched['board'] == moved['board']
+
+    status, _ = call('PUT', '/games/{gameId}', game_id, {'path': [[5, 3], [4, 4]]})
+    assert status == 400
+    status, conflict = call('PUT', '/games/{gameId}', game_id, {'path': [[2, 2], [3, 3]], 'version': 1})
+    assert status == 409
+    assert conflict['version'] == 2
+    assert call('GET', '/games/{gameId}', 'missing')[0] == 404
+
+
+def test_list_games_pages_with_a_cursor():
+    created = {call('POST', '/games')[1]['gameId'] for _ in range(3)}
+    seen = []
+    cursor = None
+    while True:
+        query = {'limit': '2', **({'cursor': cursor} if cursor else {})}
+        status, page = call('GET', '/games', query=query)
+        assert status == 200
+        seen.extend(item['gameId'] for item in page['games'])
+        cursor = page['cursor']
+        if not cursor:
+            break
+    assert created <= set(seen)
+    assert len(seen) == len(set(seen))
+
+
+def test_finished_game_updates_stats_once_and_ranks_players():
+    # Red captures black's last piece
+    board = [[''] * 8 for _ in range(8)]
+    board[5][1] = 'r'
+    board[4][2] = 'b'
+    item = {
+        'gameId': 'stats-game',
+        'currentPlayer': 'red',
+        'status': 'active',
+        'version': 1,
+        'players': {'red': 'alice', 'black': 'bob'}
+    }
+    game.store_position(item, game.rules.from_board(board))
+    game.game_table.put(item)
+    game.stats_table.update({'playerId': 'carol'}, set={'leaderboard': game.LEADERBOARD},
+                            add={'wins': 5, 'losses': 0, 'totalGames': 5})
+
+    status, moved = call('PUT', '/games/{gameId}', 'stats-game', {'path': [[5, 1], [3, 3]]})
+    assert status == 200
+    assert moved['winner'] == 'red'
+    game.update_stats(game.game_table.get({'gameId': 'stats-game'}))
+
+    alice = game.stats_table.get({'playerId': 'alice'})
+    bob = game.stats_table.get({'playerId': 'bob'})
+    assert (alice['wins'], alice['losses'], alice['totalGames']) == (1, 0, 1)
+    assert (bob['wins'], bob['losses'], bob['totalGames']) == (0, 1, 1)
+
+    status, leaderboard = call('GET', '/leaderboard', query={'limit': '2'})
+    assert status == 200
+    assert [(p['rank'], p['playerId'], p['wins']) for p in leaderboard['players']] == [(1, 'carol', 5), (2, 'alice', 1)]
+
+
+def test_conditional_get_and_cache_headers():
+    _, created = call('POST', '/games')
+    event = {
+        'httpMethod': 'GET',
+        'resource': '/games/{gameId}',
+        'pathParameters': {'gameId': created['gameId']},
+        'queryStringParameters': None,
+        'requestContext': {'identity': {}},
+        'headers': {}
+    }
+    first = game.handler(event, None)
+    etag = first['headers']['ETag']
+    assert first['statusCode'] == 200
+    assert first['headers']['Cache-Control'] == game.ACTIVE_CACHE_CONTROL
+
+    event['headers'] = {'if-none-match': etag}
+    not_modified = game.handler(event, None)
+    assert not_modified['statusCode'] == 304
+    assert not_modified['body'] == ''
+
+    # Asking for the legal moves is a different representation
+    event['queryStringParameters'] = {'includeMoves': 'true'}
+    assert game.handler(event, None)['statusCode'] == 200
+    event['queryStringParameters'] = None
+
+    call('PUT', '/games/{gameId}', created['gameId'], {'path': [[5, 1], [4, 0]]})
+    changed = game.handler(event, None)
+    assert changed['statusCode'] == 200
+    assert changed['headers']['ETag'] != etag
+
+    # Another container finishes the game; within the max-age this one
+    # still answers from its cache without reading the table
+    finished = dict(game.game_table.get({'gameId': created['gameId']}), status='finished', winner='red')
+    game.game_table.put(finished)
+    assert game.handler(event, None)['headers']['Cache-Control'] == game.ACTIVE_CACHE_CONTROL
+    game.latest_versions.clear()
+    assert game.handler(event, None)['headers']['Cache-Control'] == game.FINISHED_CACHE_CONTROL
+
+
+def test_moves_naming_a_version_are_validated_from_the_cache():
+    _, created = call('POST', '/games')
+    game_id = created['gameId']
+    hits = game.game_cache.hits
+    status, moved = call('PUT', '/games/{gameId}', game_id, {'path': [[5, 1], [4, 0]], 'version': 1})
+    assert status == 200
+    assert game.game_cache.hits == hits + 1
+
+    # Another container moves on: the cached version 2 is no longer the latest,
+    # and the conditional write turns the cached validation into a conflict
+    stored = game.game_table.get({'gameId': game_id})
+    game.game_table.put(dict(stored, version=3))
+    status, conflict = call('PUT', '/games/{gameId}', game_id, {'path': [[2, 2], [3, 3]], 'version': 2})
+    assert status == 409
+    assert conflict['version'] == 3
+
+    # An illegal move against a cached version is re-checked against the table
+    hits = game.game_cache.hits
+    status, _ = call('PUT', '/games/{gameId}', game_id, {'path': [[2, 2], [4, 4]], 'version': 3})
+    assert status == 400
+    assert game.game_cache.hits == hits + 1
+
+
+def test_malformed_move_bodies_are_rejected_without_an_error_log(capsys):
+    game_id = call('POST', '/games')[1]['gameId']
+    capsys.readouterr()
+    for body in ({'path': [[5]]}, {'path': [[5, 1]]}, {'path': [[5, 1], [4, 8]]}, {'path': [[5, 1], ['4', 0]]},
+                 {'path': 'e3-d4'}, {'fromRow': 5, 'fromCol': 1}, [[5, 1], [4, 0]]):
+        status, response = call('PUT', '/games/{gameId}', game_id, body)
+        assert status == 400
+        assert response['error'].startswith('Invalid move request: ')
+    assert 'ERROR' not in capsys.readouterr().out
+    assert call('GET', '/games/{gameId}', game_id)[1]['version'] == 1
+
+
+def test_batch_fetch_with_projection():
+    ids = [call('POST', '/games')[1]['gameId'] for _ in range(3)]
+    status, batch = call('POST', '/games/batch', body={'gameIds': ids + ['missing', ids[0]]})
+    assert status == 200
+    assert [g['gameId'] for g in batch['games']] == ids
+    assert batch['missing'] == ['missing']
+    assert batch['games'][0]['board'][5][1] == 'r'
+    assert batch['games'][0] == call('GET', '/games/{gameId}', ids[0])[1]
+
+    status, batch = call('POST', '/games/batch', body={'gameIds': ids, 'attributes': ['status', 'currentPlayer']})
+    assert status == 200
+    assert batch['games'][0] == {'gameId': ids[0], 'status': 'active', 'currentPlayer': 'red'}
+    # Stored-only attributes stay private, as in a single GET
+    status, batch = call('POST', '/games/batch', body={'gameIds': ids, 'attributes': ['packedBoard', 'statsRecorded', 'status']})
+    assert batch['games'][0] == {'gameId': ids[0], 'status': 'active'}
+
+    assert call('POST', '/games/batch', body={'gameIds': [str(i) for i in range(101)]})[0] == 400
+    assert call('POST', '/games/batch', body={'gameIds': []})[0] == 400
+    assert call('POST', '/games/batch', body={'gameIds': ids[0]})[0] == 400
+    assert call('POST', '/games/batch', body={'gameIds': {ids[0]: 1}})[0] == 400
+    assert call('POST', '/games/batch', body={'gameIds': [ids[0], 7]})[0] == 400
+
+
+def test_hint_returns_the_deepest_search_within_the_budget():
+    game_id = call('POST', '/games')[1]['gameId']
+    status, legal = call('GET', '/games/{gameId}/moves', game_id)
+    legal_paths = [move['path'] for move in legal['moves']]
+
+    status, hint = call('GET', '/games/{gameId}/hint', game_id, query={'budgetMs': '50'})
+    assert status == 200
+    assert hint['move'] in legal_paths
+    assert hint['pv'][0] == hint['move']
+    assert hint['depth'] >= 1 and hint['budgetMs'] == 50
+
+    assert call('GET', '/games/{gameId}/hint', game_id, query={'budgetMs': 'soon'})[0] == 400
+    assert call('GET', '/games/{gameId}/hint', 'missing')[0] == 404
+
+
+def test_hint_answers_within_its_budget(monkeypatch):
+    game_id = call('POST', '/games')[1]['gameId']
+    key = {'positionKey': analysis.position_key(game.read_position(game.load_game(game_id)), 'red')}
+    call('GET', '/games/{gameId}/hint', game_id, query={'budgetMs': '10'})
+    # A slow analysis table read is charged to the budget as well
+    slow_get = analysis.analysis_table.get
+    monkeypatch.setattr(analysis.analysis_table, 'get', lambda key: time.sleep(0.005) or slow_get(key))
+    for budget_ms in (10, 50, 200):
+        analysis.analysis_cache.clear()
+        analysis.analysis_table.delete(key)
+        started = time.perf_counter()
+        status, hint = call('GET', '/games/{gameId}/hint', game_id, query={'budgetMs': str(budget_ms)})
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        assert status == 200 and not hint['cached']
+        assert elapsed_ms < budget_ms + 10
+
+
+def test_replay_lists_moves_and_rebuilds_any_ply(monkeypatch):
+    monkeypatch.setattr(game, 'MOVE_SNAPSHOT_INTERVAL', 3)
+    game_id = call('POST', '/games')[1]['gameId']
+    boards = [call('GET', '/games/{gameId}', game_id)[1]['board']]
+    for _ in range(7):
+        _, legal = call('GET', '/games/{gameId}/moves', game_id)
+        status, moved = call('PUT', '/games/{gameId}', game_id, {'path': legal['moves'][-1]['path']})
+        assert status == 200
+        boards.append(moved['board'])
+
+    entries, _ = game.move_log_table.query(None, ('gameId', game_id), 10)
+    assert [entry['ply'] for entry in entries if 'packedBoard' in entry] == [0, 3, 6]
+
+    seen, cursor = [], None
+    while True:
+        status, page = call('GET', '/games/{gameId}/replay', game_id, query={'limit': '3', **({'cursor': cursor} if cursor else {})})
+        assert status == 200
+        seen.extend(page['moves'])
+        cursor = page['cursor']
+        if not cursor:
+            break
+    assert [move['ply'] for move in seen] == list(range(1, 8))
+    assert [move['player'] for move in seen[:2]] == ['red', 'black']
+
+    for ply, board in enumerate(boards):
+        status, replayed = call('GET', '/games/{gameId}/replay', game_id, query={'ply': str(ply)})
+        assert status == 200
+        assert replayed['board'] == board
+        assert replayed['currentPlayer'] == ('red' if ply % 2 == 0 else 'black')
+    assert call('GET', '/games/{gameId}/replay', game_id, query={'ply': '8'})[0] == 404
+    assert call('GET', '/games/{gameId}/replay', game_id, query={'ply': 'x'})[0] == 400
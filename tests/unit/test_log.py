@@ -0,0 +1,41 @@
+import json
+
+import game
+import log
+
+
+def records(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_debug_is_silent_below_the_level(capsys, monkeypatch):
+    monkeypatch.setattr(log, 'LEVEL', log.WARNING)
+    log.debug('hidden')
+    log.info('hidden')
+    log.warning('shown', gameId='g1')
+    assert records(capsys) == [{'level': 'WARNING', 'message': 'shown', 'gameId': 'g1'}]
+
+
+def test_one_metric_record_per_move_with_phase_timings(capsys, monkeypatch):
+    monkeypatch.setattr(log, 'LEVEL', log.WARNING)
+    event = {
+        'httpMethod': 'POST', 'resource': '/games', 'pathParameters': None,
+        'queryStringParameters': None, 'requestContext': {'identity': {}}, 'body': None
+    }
+    game_id = json.loads(game.handler(event, None)['body'])['gameId']
+    capsys.readouterr()
+
+    move = {**event, 'httpMethod': 'PUT', 'resource': '/games/{gameId}', 'pathParameters': {'gameId': game_id},
+            'body': json.dumps({'path': [[5, 1], [4, 0]]})}
+    assert game.handler(move, None)['statusCode'] == 200
+    [record] = records(capsys)
+
+    assert record['route'] == 'PUT /games/{gameId}'
+    assert record['statusCode'] == 200
+    assert record['gameId'] == game_id
+    metrics = record['_aws']['CloudWatchMetrics'][0]
+    assert metrics['Dimensions'] == [['route']]
+    names = {metric['Name'] for metric in metrics['Metrics']}
+    assert {'latencyMs', 'parseMs', 'readMs', 'validateMs', 'applyMs', 'writeMs', 'serializeMs'} <= names
+    assert all(record[name] >= 0 for name in names)
+    assert record['latencyMs'] >= record['applyMs']
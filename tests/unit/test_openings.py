@@ -0,0 +1,43 @@
+import random
+
+import engine
+import openings
+import rules
+
+
+def test_book_lookup_finds_every_reply(tmp_path):
+    pos, color = rules.INITIAL, rules.RED
+    moves = rules.legal_moves(pos, color)
+    h = engine.zobrist_hash(pos, color)
+    entries = {(h, 0): 3, (h, 2): 1}
+    # Neighbouring hashes must not leak into the lookup
+    entries[(h - 1, 0)] = 5
+    entries[(h + 1, 1)] = 5
+    path = tmp_path / 'test.book'
+    openings.write(str(path), entries)
+
+    book = openings.OpeningBook(str(path))
+    assert len(book) == 4
+    assert sorted(book.replies(pos, color)) == sorted([(moves[0], 3), (moves[2], 1)])
+    assert book.choose(pos, color, random.Random(1)) in (moves[0], moves[2])
+
+    other = engine.make_move(pos, color, moves[0])
+    assert book.replies(other, rules.BLACK) == []
+    assert book.choose(other, rules.BLACK) is None
+
+
+def test_import_counts_replies():
+    games = ['5,1-4,0 2,2-3,3', '5,1-4,0 2,2-3,1', '5,3-4,4']
+    entries = openings.import_games(games, plies=2)
+    h = engine.zobrist_hash(rules.INITIAL, rules.RED)
+    first = rules.legal_moves(rules.INITIAL, rules.RED).index(
+        (rules.square_index(5, 1), rules.square_index(4, 0)))
+    assert entries[(h, first)] == 2
+    assert sum(entries.values()) == 5
+
+
+def test_shipped_book_covers_the_initial_position():
+    book = openings.default_book()
+    assert book is not None
+    move = book.choose(rules.INITIAL, rules.RED)
+    assert move in rules.legal_moves(rules.INITIAL, rules.RED)
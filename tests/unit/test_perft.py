@@ -0,0 +1,84 @@
+import pytest
+
+import perft
+
+# Reference counts up to this size are checked on every run; the deeper ones
+# are for `python benchmarks/perft.py`
+MAX_TEST_NODES = 20000
+
+
+# An independent square-by-square move generator on the 8x8 board, written
+# without the bitboard code so the two can check each other
+def _dirs(piece):
+    if piece.isupper():
+        return [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    return [(-1, -1), (-1, 1)] if piece == 'r' else [(1, -1), (1, 1)]
+
+
+def _on(r, c):
+    return 0 <= r < 8 and 0 <= c < 8
+
+
+def _jumps(board, r, c, path):
+    piece = board[r][c]
+    found = []
+    for dr, dc in _dirs(piece):
+        mr, mc, tr, tc = r + dr, c + dc, r + 2 * dr, c + 2 * dc
+        if not _on(tr, tc) or board[tr][tc] or not board[mr][mc]:
+            continue
+        if board[mr][mc].lower() == piece.lower():
+            continue
+        nb = [row[:] for row in board]
+        nb[mr][mc] = ''
+        nb[r][c] = ''
+        crowned = piece.islower() and tr == (0 if piece == 'r' else 7)
+        nb[tr][tc] = piece.upper() if crowned else piece
+        new_path = path + [(tr, tc)]
+        more = [] if crowned else _jumps(nb, tr, tc, new_path)
+        found.extend(more or [(new_path, nb)])
+    return found
+
+
+def naive_moves(board, color):
+    own = color[0]
+    captures, steps = [], []
+    for r in range(8):
+        for c in range(8):
+            piece = board[r][c]
+            if not piece or piece.lower() != own:
+                continue
+            captures.extend(_jumps(board, r, c, [(r, c)]))
+            for dr, dc in _dirs(piece):
+                tr, tc = r + dr, c + dc
+                if _on(tr, tc) and not board[tr][tc]:
+                    nb = [row[:] for row in board]
+                    nb[r][c] = ''
+                    crowned = piece.islower() and tr == (0 if piece == 'r' else 7)
+                    nb[tr][tc] = piece.upper() if crowned else piece
+                    steps.append(([(r, c), (tr, tc)], nb))
+    return captures or steps
+
+
+def naive_perft(board, color, depth):
+    result = naive_moves(board, color)
+    if depth == 1:
+        return len(result)
+    other = 'black' if color == 'red' else 'red'
+    return sum(naive_perft(nb, other, depth - 1) for _, nb in result)
+
+
+@pytest.mark.parametrize('name', sorted(perft.POSITIONS))
+def test_perft_matches_reference_counts(name):
+    pos, color = perft.position_of(name)
+    for depth, expected in sorted(perft.POSITIONS[name]['counts'].items()):
+        if expected > MAX_TEST_NODES:
+            break
+        assert perft.perft(pos, color, depth) == expected, f"{name} depth {depth}"
+
+
+@pytest.mark.parametrize('name', sorted(perft.POSITIONS))
+def test_independent_generator_agrees(name):
+    entry = perft.POSITIONS[name]
+    board = perft.parse_board(entry['board']) if entry['board'] else perft.rules.to_board(perft.rules.INITIAL)
+    for depth in (1, 2, 3, 4):
+        assert naive_perft(board, entry['color'], depth) == entry['counts'][depth], f"{name} depth {depth}"
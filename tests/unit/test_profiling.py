@@ -0,0 +1,57 @@
+import os
+import pstats
+import subprocess
+import sys
+import time
+
+import cold_start
+import game
+import profiling
+
+EVENT = {
+    'httpMethod': 'POST', 'resource': '/games', 'pathParameters': None,
+    'queryStringParameters': None, 'requestContext': {'identity': {}}, 'body': None
+}
+
+
+def test_handler_is_unwrapped_when_profiling_is_off():
+    assert game.handler is game.handle
+    assert profiling.profiled(game.handle) is game.handle
+
+
+def test_sampled_invocation_writes_pstats_and_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(profiling, 'SINK', str(tmp_path))
+    response = profiling.profiled(game.handle)(EVENT, None)
+    assert response['statusCode'] == 201
+
+    [prof] = tmp_path.glob('*-POST-games-*.prof')
+    stats = pstats.Stats(str(prof))
+    assert any(function == 'create_game' for _, _, function in stats.stats)
+    assert 'create_game' in prof.with_suffix('.txt').read_text()
+
+
+def test_only_signed_unexpired_tokens_enable_profiling(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'SECRET', 's3cret')
+    monkeypatch.setattr(profiling, 'SINK', str(tmp_path))
+    expires = int(time.time()) + 60
+
+    def event(token):
+        return {**EVENT, 'headers': {'X-Profile-Token': token}}
+
+    assert profiling.has_valid_token(event(profiling.token(expires)))
+    assert not profiling.has_valid_token(event(profiling.token(expires, 'other')))
+    assert not profiling.has_valid_token(event(profiling.token(time.time() - 1)))
+    assert not profiling.has_valid_token(event('garbage'))
+
+    wrapped = profiling.profiled(game.handle)
+    wrapped(event('garbage'), None)
+    assert not list(tmp_path.iterdir())
+    wrapped(event(profiling.token(expires)), None)
+    assert len(list(tmp_path.glob('*.prof'))) == 1
+
+
+def test_profiler_modules_stay_unloaded_when_off():
+    code = "import sys, game; assert not {'cProfile', 'pstats'} & set(sys.modules), sorted(sys.modules)"
+    env = {**os.environ, 'STORAGE_BACKEND': 'memory', 'PROFILE_SAMPLE_RATE': '0', 'PROFILE_SECRET': ''}
+    subprocess.run([sys.executable, '-c', code], cwd=cold_start.LAMBDA_DIR, env=env, check=True)
@@ -0,0 +1,51 @@
+import json
+
+import game
+import push
+
+
+def ws_event(route, connection_id, game_id=None, player_id=None):
+    return {
+        'requestContext': {
+            'routeKey': route,
+            'connectionId': connection_id,
+            'identity': {'cognitoIdentityId': player_id} if player_id else {}
+        },
+        'queryStringParameters': {'gameId': game_id} if game_id else None
+    }
+
+
+def test_moves_are_pushed_to_players_and_spectators():
+    created = json.loads(game.create_game({'requestContext': {'identity': {'cognitoIdentityId': 'alice'}}, 'body': None})['body'])
+    game_id = created['gameId']
+
+    assert push.handler(ws_event('$connect', 'c1', game_id, 'alice'), None)['statusCode'] == 200
+    assert push.handler(ws_event('$connect', 'c2', game_id), None)['statusCode'] == 200
+    assert push.handler(ws_event('$connect', 'c3', 'no-such-game'), None)['statusCode'] == 404
+    roles = {item['connectionId']: item['role'] for item in push.connections(game_id)}
+    assert roles == {'c1': 'player', 'c2': 'spectator'}
+
+    response = game.handler({
+        'httpMethod': 'PUT',
+        'resource': '/games/{gameId}',
+        'pathParameters': {'gameId': game_id},
+        'requestContext': {'identity': {}},
+        'body': json.dumps({'path': [[5, 1], [4, 0]]})
+    }, None)
+    assert response['statusCode'] == 200
+
+    broker = push.broker()
+    for connection_id in ('c1', 'c2'):
+        (message,) = broker.messages[connection_id]
+        assert message['type'] == 'gameUpdated'
+        assert message['currentPlayer'] == 'black'
+        assert message['board'][4][0] == 'r'
+        assert len(message['legalMoves']) == 7
+
+    # A connection that vanished without $disconnect is dropped on the next push
+    broker.close('c2')
+    assert push.publish(game_id, json.dumps({'type': 'ping'})) == 1
+    assert [item['connectionId'] for item in push.connections(game_id)] == ['c1']
+
+    push.handler(ws_event('$disconnect', 'c1'), None)
+    assert list(push.connections(game_id)) == []
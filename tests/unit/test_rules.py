@@ -0,0 +1,162 @@
+import random
+
+import rules
+
+
+def empty_board():
+    return [[''] * 8 for _ in range(8)]
+
+
+def test_initial_position_round_trip():
+    board = rules.to_board(rules.INITIAL)
+    assert board[0] == ['b', '', 'b', '', 'b', '', 'b', '']
+    assert board[7] == ['', 'r', '', 'r', '', 'r', '', 'r']
+    assert rules.from_board(board) == rules.INITIAL
+
+
+def test_square_mapping():
+    assert rules.square_index(0, 0) == 0
+    assert rules.square_index(1, 7) == 7
+    assert rules.square_index(7, 7) == 31
+    assert rules.square_index(0, 1) == -1
+    assert rules.square_index(8, 0) == -1
+    for s in range(32):
+        assert rules.square_index(*rules.square_coords(s)) == s
+
+
+def test_initial_mobility():
+    # Only the front row of each side can step
+    assert rules.movers(rules.INITIAL, 'red') == 0x00F00000
+    assert rules.movers(rules.INITIAL, 'black') == 0x00000F00
+    assert rules.jumpers(rules.INITIAL, 'red') == 0
+    assert rules.count_pieces(rules.INITIAL, 'red') == 12
+
+
+def test_men_only_move_forward():
+    board = empty_board()
+    board[4][4] = 'r'
+    pos = rules.from_board(board)
+    here = rules.square_index(4, 4)
+    assert rules.is_valid_step(pos, here, rules.square_index(3, 3), 'red')
+    assert rules.is_valid_step(pos, here, rules.square_index(3, 5), 'red')
+    assert not rules.is_valid_step(pos, here, rules.square_index(5, 3), 'red')
+    assert not rules.is_valid_step(pos, here, rules.square_index(3, 3), 'black')
+
+
+def test_king_moves_backwards_and_captures():
+    board = empty_board()
+    board[2][2] = 'R'
+    board[3][3] = 'b'
+    pos = rules.from_board(board)
+    here = rules.square_index(2, 2)
+    assert rules.is_valid_step(pos, here, rules.square_index(1, 1), 'red')
+    assert rules.has_jump_from(pos, here, 'red')
+    pos, captured, promoted = rules.apply_step(pos, here, rules.square_index(4, 4), 'red')
+    assert captured == rules.square_index(3, 3)
+    assert not promoted
+    assert pos.black == 0
+    assert pos.kings == 1 << rules.square_index(4, 4)
+
+
+def test_jump_at_board_edge_does_not_wrap():
+    board = empty_board()
+    board[5][1] = 'r'
+    board[4][0] = 'b'
+    pos = rules.from_board(board)
+    assert rules.jumpers(pos, 'red') == 0
+    assert not rules.has_jump_from(pos, rules.square_index(5, 1), 'red')
+
+
+def test_promotion():
+    board = empty_board()
+    board[1][1] = 'r'
+    pos = rules.from_board(board)
+    pos, captured, promoted = rules.apply_step(
+        pos, rules.square_index(1, 1), rules.square_index(0, 0), 'red')
+    assert captured == -1
+    assert promoted
+    assert rules.to_board(pos)[0][0] == 'R'
+
+
+def test_check_winner_when_opponent_is_blocked():
+    board = empty_board()
+    board[0][0] = 'b'
+    board[1][1] = 'r'
+    board[2][2] = 'r'
+    pos = rules.from_board(board)
+    assert rules.check_winner(pos, 'red') == 'red'
+    assert rules.check_winner(pos, 'black') is None
+
+
+def test_legal_moves_from_initial_position():
+    moves = rules.legal_moves(rules.INITIAL, 'red')
+    assert len(moves) == 7
+    assert all(len(move) == 2 for move in moves)
+
+
+def test_legal_moves_force_captures_and_follow_chains():
+    board = empty_board()
+    board[6][0] = 'r'
+    board[5][1] = 'b'
+    board[3][3] = 'b'
+    board[7][7] = 'r'
+    pos = rules.from_board(board)
+    moves = rules.legal_moves(pos, 'red')
+    sq = rules.square_index
+    assert moves == [(sq(6, 0), sq(4, 2), sq(2, 4))]
+
+
+def test_crowning_ends_a_capture_chain():
+    board = empty_board()
+    board[2][2] = 'r'
+    board[1][1] = 'b'
+    board[1][3] = 'b'
+    pos = rules.from_board(board)
+    moves = rules.legal_moves(pos, 'red')
+    sq = rules.square_index
+    # Landing on the back row crowns the man, so no further jump over (1, 3)
+    assert (sq(2, 2), sq(0, 0)) in moves
+    assert (sq(2, 2), sq(0, 4)) in moves
+    assert len(moves) == 2
+
+
+def test_legal_moves_restricted_to_jumping_piece():
+    board = empty_board()
+    board[5][1] = 'r'
+    board[4][2] = 'b'
+    board[5][5] = 'r'
+    board[4][6] = 'b'
+    pos = rules.from_board(board)
+    assert len(rules.legal_moves(pos, 'red')) == 2
+    assert rules.legal_moves(pos, 'red', rules.square_index(5, 5)) == [
+        (rules.square_index(5, 5), rules.square_index(3, 7))]
+
+
+def test_packed_round_trip():
+    packed = rules.to_packed(rules.INITIAL)
+    assert packed == 'b' * 12 + '.' * 8 + 'r' * 12
+    board = empty_board()
+    board[0][0] = 'R'
+    board[7][7] = 'B'
+    pos = rules.from_board(board)
+    assert rules.from_packed(rules.to_packed(pos)) == pos
+
+
+def test_incremental_summary_matches_full_recount():
+    rng = random.Random(7)
+    assert rules.summarize(rules.INITIAL)['red'] == {'pieces': 12, 'kings': 0, 'steps': 7, 'jumps': 0}
+    for _ in range(20):
+        pos, color = rules.INITIAL, 'red'
+        summary = rules.summarize(pos)
+        for _ in range(150):
+            moves = rules.legal_moves(pos, color)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            after = pos
+            for hop_from, hop_to in zip(move, move[1:]):
+                after = rules.apply_step(after, hop_from, hop_to, color)[0]
+            summary = rules.update_summary(summary, pos, after)
+            assert summary == rules.summarize(after)
+            assert rules.summary_winner(summary, color) == rules.check_winner(after, color)
+            pos, color = after, rules.opponent(color)
@@ -0,0 +1,28 @@
+import json
+
+import engine
+import rules
+import selfplay
+
+
+def test_random_game_is_legal_and_reproducible():
+    task = (0, 42, {'red': 'random', 'black': 'random'}, 100, 2, 0, 400)
+    record = selfplay.play_game(task)
+    assert selfplay.play_game(task)['moves'] == record['moves']
+
+    pos, color = rules.INITIAL, rules.RED
+    for path in record['moves']:
+        move = tuple(rules.square_index(row, col) for row, col in path)
+        assert move in rules.legal_moves(pos, color)
+        pos, color = engine.make_move(pos, color, move), rules.opponent(color)
+    if record['winner']:
+        assert rules.check_winner(pos, rules.opponent(color)) == record['winner']
+
+
+def test_cli_streams_one_line_per_game(tmp_path):
+    output = tmp_path / 'games.ndjson'
+    selfplay.main(['--games', '4', '--red', 'random', '--black', 'bot', '--depth', '1',
+                   '--workers', '2', '--output', str(output)])
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record['game'] for record in records) == [0, 1, 2, 3]
+    assert all(record['black'] == 'bot' and record['plies'] > 0 for record in records)
@@ -0,0 +1,70 @@
+import json
+
+import dynamo
+import game
+import stats
+
+
+def finished_game(game_id):
+    board = [[''] * 8 for _ in range(8)]
+    board[0][0] = 'R'
+    item = {
+        'gameId': game_id,
+        'currentPlayer': 'black',
+        'status': 'finished',
+        'winner': 'red',
+        'version': 5,
+        'players': {'red': f'{game_id}-red', 'black': f'{game_id}-black'}
+    }
+    game.store_position(item, game.rules.from_board(board))
+    game.game_table.put(item)
+    return item
+
+
+def stream_event(*items):
+    return {'Records': [
+        {'eventName': 'MODIFY', 'dynamodb': {'SequenceNumber': str(n), 'NewImage': dynamo.serialize_item(item)}}
+        for n, item in enumerate(items)
+    ]}
+
+
+def fail(updates):
+    raise RuntimeError('throttled')
+
+
+def wins(player_id):
+    return (game.stats_table.get({'playerId': player_id}) or {}).get('wins', 0)
+
+
+def test_stream_records_each_finished_game_once():
+    item = finished_game('stream-game')
+    assert stats.handler(stream_event(item, item), None) == {'batchItemFailures': []}
+    recorded = game.game_table.get({'gameId': 'stream-game'})
+    assert recorded['statsRecorded'] is True
+    assert stats.handler(stream_event(recorded), None) == {'batchItemFailures': []}
+    assert wins('stream-game-red') == 1
+
+
+def test_stream_reports_failures_for_retry(monkeypatch):
+    item = finished_game('failing-game')
+    monkeypatch.setattr(game.storage, 'transact', fail)
+    assert stats.handler(stream_event(item), None) == {'batchItemFailures': [{'itemIdentifier': '0'}]}
+    assert 'statsRecorded' not in game.game_table.get({'gameId': 'failing-game'})
+
+
+def test_failed_inline_update_is_retried_on_the_next_read(monkeypatch):
+    finished_game('retry-game')
+    event = {
+        'httpMethod': 'GET', 'resource': '/games/{gameId}', 'pathParameters': {'gameId': 'retry-game'},
+        'queryStringParameters': None, 'requestContext': {'identity': {}}, 'body': None
+    }
+    transact = game.storage.transact
+    monkeypatch.setattr(game.storage, 'transact', fail)
+    assert game.handler(event, None)['statusCode'] == 200
+    assert wins('retry-game-red') == 0
+
+    monkeypatch.setattr(game.storage, 'transact', transact)
+    for _ in range(2):
+        assert json.loads(game.handler(event, None)['body'])['winner'] == 'red'
+    assert wins('retry-game-red') == 1
+    assert game.game_table.get({'gameId': 'retry-game'})['statsRecorded'] is True
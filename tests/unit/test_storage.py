@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+import storage
+
+
+def make_table():
+    return storage.MemoryTable('test', key='gameId', indexes={
+        'byStatus': ('status', 'updatedAt', ('winner',))
+    })
+
+
+def test_conditional_writes():
+    table = make_table()
+    table.put({'gameId': 'a', 'version': 1}, if_absent=True)
+    with pytest.raises(storage.ConditionFailed):
+        table.put({'gameId': 'a', 'version': 9}, if_absent=True)
+
+    table.update({'gameId': 'a'}, set={'version': 2, 'status': 'active'}, expected={'version': 1})
+    with pytest.raises(storage.ConditionFailed):
+        table.update({'gameId': 'a'}, set={'version': 3}, expected={'version': 1})
+    with pytest.raises(storage.ConditionFailed):
+        table.update({'gameId': 'a'}, set={'version': 3}, expected={'version': None})
+    table.update({'gameId': 'a'}, remove=['status'])
+    assert table.get({'gameId': 'a'}) == {'gameId': 'a', 'version': 2}
+
+    # Returned items are copies
+    table.get({'gameId': 'a'})['version'] = 99
+    assert table.get({'gameId': 'a'})['version'] == 2
+
+
+def test_below_condition_keeps_the_larger_value():
+    table = make_table()
+    table.update({'gameId': 'a'}, set={'depth': 4}, below={'depth': 4})
+    table.update({'gameId': 'a'}, set={'depth': 6}, below={'depth': 6})
+    for depth in (6, 5):
+        with pytest.raises(storage.ConditionFailed):
+            table.update({'gameId': 'a'}, set={'depth': depth}, below={'depth': depth})
+    assert table.get({'gameId': 'a'})['depth'] == 6
+
+    request = storage.DynamoTable.update_request(None, {'gameId': 'a'}, set={'depth': 7}, below={'depth': 7})
+    assert request['ConditionExpression'] == '(attribute_not_exists(#b0) OR #b0 < :b0)'
+    assert request['ExpressionAttributeValues'][':b0'] == 7
+
+
+def test_only_one_concurrent_update_wins():
+    table = make_table()
+    table.put({'gameId': 'a', 'version': 1})
+    wins = []
+
+    def bump(n):
+        try:
+            table.update({'gameId': 'a'}, set={'version': 2, 'by': n}, expected={'version': 1})
+            wins.append(n)
+        except storage.ConditionFailed:
+            pass
+
+    threads = [threading.Thread(target=bump, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(wins) == 1
+    assert table.get({'gameId': 'a'})['by'] == wins[0]
+
+
+def test_query_pages_through_an_index():
+    table = make_table()
+    for i in range(5):
+        table.put({'gameId': f'g{i}', 'status': 'active', 'updatedAt': f'2024-01-0{i + 1}', 'secret': i})
+    table.put({'gameId': 'done', 'status': 'finished', 'updatedAt': '2024-01-09', 'winner': 'red'})
+    table.put({'gameId': 'unindexed', 'status': 'active'})
+
+    seen = []
+    start_key = None
+    while True:
+        items, start_key = table.query('byStatus', ('status', 'active'), 2, start_key=start_key, forward=False)
+        seen.extend(items)
+        if start_key is None:
+            break
+    assert [item['gameId'] for item in seen] == ['g4', 'g3', 'g2', 'g1', 'g0']
+    assert all('secret' not in item for item in seen)
+
+    items, last_key = table.query('byStatus', ('status', 'finished'), 1)
+    assert items == [{'gameId': 'done', 'status': 'finished', 'updatedAt': '2024-01-09', 'winner': 'red'}]
+    # Like DynamoDB, a full page hands back a key even when nothing follows
+    assert table.query('byStatus', ('status', 'finished'), 1, start_key=last_key) == ([], None)
+
+
+def test_dynamo_batch_get_retries_unprocessed_keys(monkeypatch):
+    calls = []
+
+    class Client:
+        def batch_get_item(self, RequestItems):
+            keys = RequestItems['games']['Keys']
+            calls.append(RequestItems)
+            # Process one key per call, like a throttled table
+            first, rest = keys[0], keys[1:]
+            response = {'Responses': {'games': [{**first, 'status': {'S': 'active'}}]}}
+            if rest:
+                response['UnprocessedKeys'] = {'games': {**RequestItems['games'], 'Keys': rest}}
+            return response
+
+    monkeypatch.setattr(storage.dynamo, '_client', Client())
+    monkeypatch.setattr(storage.time, 'sleep', lambda seconds: None)
+    table = storage.DynamoTable('games', key='gameId')
+    items = table.batch_get([{'gameId': 'a'}, {'gameId': 'b'}, {'gameId': 'c'}], ['gameId', 'status'])
+    assert items == [{'gameId': g, 'status': 'active'} for g in 'abc']
+    assert len(calls) == 3
+    assert calls[-1]['games']['ProjectionExpression'] == '#p0, #p1'
+
+
+def test_sort_key_table_pages_through_a_partition():
+    table = storage.MemoryTable('log', key='gameId', sort_key='ply')
+    for ply in range(5):
+        table.put({'gameId': 'a', 'ply': ply}, if_absent=True)
+    table.put({'gameId': 'b', 'ply': 0})
+    with pytest.raises(storage.ConditionFailed):
+        table.put({'gameId': 'a', 'ply': 3}, if_absent=True)
+    assert table.get({'gameId': 'a', 'ply': 4}) == {'gameId': 'a', 'ply': 4}
+
+    page, last_key = table.query(None, ('gameId', 'a'), 2, start_key={'gameId': 'a', 'ply': 4}, forward=False)
+    assert [item['ply'] for item in page] == [3, 2]
+    page, last_key = table.query(None, ('gameId', 'a'), 2, start_key=last_key, forward=False)
+    assert [item['ply'] for item in page] == [1, 0]
+    assert table.query(None, ('gameId', 'a'), 2, start_key=last_key, forward=False) == ([], None)
@@ -0,0 +1,98 @@
+import io
+import json
+
+import pytest
+
+import engine
+import log
+import rules
+import tablebase
+
+
+@pytest.fixture(scope='module')
+def endgame(tmp_path_factory):
+    # Kings-only endings never leave their own signatures, so they can be
+    # solved without the (much larger) tables with men
+    path = tmp_path_factory.mktemp('tablebase') / 'endgame.cktb'
+    solved = {}
+    for sig in tablebase.signatures(3):
+        if sig[0] == sig[2] == 0:
+            solved[sig] = tablebase._solve_signature(sig, solved)
+    tablebase.write(str(path), 3, solved)
+    table = tablebase.Tablebase(str(path))
+    yield table
+    table.close()
+
+
+def empty_board():
+    return [[''] * 8 for _ in range(8)]
+
+
+def test_indices_are_unique_within_a_signature():
+    sig = (1, 1, 0, 1)
+    seen = set()
+    for pos in tablebase._placements(sig):
+        for color in ('red', 'black'):
+            index = tablebase.local_index(pos, color, sig)
+            assert 0 <= index < tablebase.block_size(sig)
+            seen.add(index)
+    assert len(seen) == 2 * len(list(tablebase._placements(sig)))
+
+
+def test_blocked_king_loses_immediately(endgame):
+    board = empty_board()
+    board[0][0] = 'B'
+    board[1][1] = 'R'
+    board[2][2] = 'R'
+    pos = rules.from_board(board)
+    assert endgame.probe(pos, 'black') == (tablebase.LOSS, 0)
+    assert endgame.probe(pos, 'red')[0] == tablebase.WIN
+
+
+def test_lone_king_in_the_double_corner_draws(endgame):
+    board = empty_board()
+    board[0][6] = 'B'
+    board[4][4] = 'R'
+    pos = rules.from_board(board)
+    assert endgame.probe(pos, 'red') == (tablebase.DRAW, None)
+    assert endgame.probe(pos, 'black') == (tablebase.DRAW, None)
+
+
+def test_two_kings_beat_one(endgame):
+    board = empty_board()
+    board[2][2] = 'R'
+    board[4][4] = 'R'
+    board[7][7] = 'B'
+    pos = rules.from_board(board)
+    result, distance = endgame.probe(pos, 'red')
+    assert result == tablebase.WIN
+    assert endgame.probe(pos.__class__(pos.red, 0, 0), 'red') is None
+
+
+def test_engine_uses_the_tablebase(endgame):
+    board = empty_board()
+    board[2][2] = 'R'
+    board[4][4] = 'R'
+    board[7][7] = 'B'
+    pos = rules.from_board(board)
+    result = engine.search(pos, 'red', budget_ms=300, table={}, endgame=endgame)
+    assert result.score >= engine.MATE_THRESHOLD
+
+
+def test_default_tablebase_logs_whether_it_loaded(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(log, 'LEVEL', log.INFO)
+    path = tmp_path / 'endgame.cktb'
+    tablebase.generate(2, str(path), progress=io.StringIO())
+    monkeypatch.setenv('TABLEBASE_PATH', str(path))
+    monkeypatch.setattr(tablebase, '_default', None)
+    table = tablebase.default_tablebase()
+    assert table.max_pieces == 2
+    monkeypatch.setenv('TABLEBASE_PATH', str(tmp_path / 'missing.cktb'))
+    monkeypatch.setattr(tablebase, '_default', None)
+    assert tablebase.default_tablebase() is None
+    table.close()
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r['level'], r['message'], r['path']) for r in records] == [
+        ('INFO', 'Endgame tablebase loaded', str(path)),
+        ('WARNING', 'Endgame tablebase missing', str(tmp_path / 'missing.cktb'))
+    ]
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+import rules
+
+np = pytest.importorskip('numpy')
+import vectorized  # noqa: E402
+
+
+def random_positions(count, seed=7):
+    rng = random.Random(seed)
+    positions = [rules.INITIAL]
+    for _ in range(count):
+        squares = rng.sample(range(32), rng.randint(2, 24))
+        split = rng.randint(1, len(squares) - 1)
+        red = sum(1 << s for s in squares[:split])
+        black = sum(1 << s for s in squares[split:])
+        kings = sum(1 << s for s in squares if rng.random() < 0.3)
+        positions.append(rules.Position(red, black, kings))
+    return positions
+
+
+def test_batch_matches_scalar_rules():
+    positions = random_positions(500)
+    bitboards = vectorized.from_positions(positions)
+    boards = vectorized.from_boards([rules.to_board(pos) for pos in positions])
+    assert (vectorized.to_bitboards(boards) == bitboards).all()
+
+    for batch in (bitboards, boards):
+        for color in (rules.RED, rules.BLACK):
+            counts = vectorized.count_pieces(batch, color)
+            movers = vectorized.movers(batch, color)
+            jumpers = vectorized.jumpers(batch, color)
+            mobility = vectorized.mobility(batch, color)
+            any_moves = vectorized.has_any_moves(batch, color)
+            winners = vectorized.check_winner(batch, color)
+            for i, pos in enumerate(positions):
+                assert counts[i] == rules.count_pieces(pos, color)
+                assert movers[i] == rules.movers(pos, color)
+                assert jumpers[i] == rules.jumpers(pos, color)
+                assert mobility[i] == len({move[:2] for move in rules.legal_moves(pos, color)})
+                assert any_moves[i] == rules.has_any_moves(pos, color)
+                assert winners[i] == vectorized.WINNER_CODES[rules.check_winner(pos, color)]
+
+
+def test_material_and_mixed_sides_to_move():
+    positions = random_positions(50, seed=3)
+    batch = vectorized.from_positions(positions)
+    material = vectorized.material(batch)
+    for i, pos in enumerate(positions):
+        red_kings = rules.count_pieces(rules.Position(pos.red & pos.kings, 0, 0), rules.RED)
+        black_kings = rules.count_pieces(rules.Position(0, pos.black & pos.kings, 0), rules.BLACK)
+        assert list(material[i]) == [
+            rules.count_pieces(pos, rules.RED) - red_kings, red_kings,
+            rules.count_pieces(pos, rules.BLACK) - black_kings, black_kings
+        ]
+
+    sides = [rules.RED if i % 2 else rules.BLACK for i in range(len(positions))]
+    capture = vectorized.can_capture(batch, sides)
+    assert list(capture) == [bool(rules.jumpers(pos, side)) for pos, side in zip(positions, sides)]
+    assert (vectorized.can_capture(batch, np.array(sides) == rules.BLACK) == capture).all()
+
+
+def test_rejects_other_shapes():
+    with pytest.raises(ValueError):
+        vectorized.to_bitboards(np.zeros((4, 2), dtype=np.uint32))